@@ -30,6 +30,101 @@ class Settings(BaseSettings):
     
     TWELVE_DATA_SECRET_KEY: str = "your-secret-key"
     TWELVE_DATA_SECRET_API_KEY: str = "your-secret-key"
+    TWELVE_DATA_BASE_URL: str = "https://api.twelvedata.com"
+    
+    # Quote refresh scheduler settings
+    QUOTE_REFRESH_ENABLED: bool = False
+    QUOTE_SOURCE: str = "twelvedata"
+    QUOTE_REFRESH_BATCH_SIZE: int = 8
+    QUOTE_REFRESH_MAX_BATCHES_PER_ROUND: int = 4
+    QUOTE_REFRESH_TICK_SECONDS: float = 1.0
+    QUOTE_REFRESH_BASE_INTERVAL: float = 60.0  # seconds, for a symbol with one watcher
+    QUOTE_REFRESH_MIN_INTERVAL: float = 10.0
+    QUOTE_REFRESH_MAX_INTERVAL: float = 3600.0
+    QUOTE_REFRESH_OFF_HOURS_MULTIPLIER: float = 10.0
+    QUOTE_REFRESH_UNIVERSE_INTERVAL: float = 300.0  # how often watchlists are re-scanned
+    # Every worker starts the scheduler; only the holder of this lease refreshes
+    QUOTE_REFRESH_LEASE_SECONDS: float = 30.0
+    
+    # Market simulator settings (QUOTE_SOURCE=simulated and the fake Twelve Data server)
+    SIMULATOR_INSTRUMENTS: int = 500
+    SIMULATOR_SEED: int = 42
+    SIMULATOR_STEP_SECONDS: float = 1.0
+    
+    # Rate limiting and load shedding settings
+    RATE_LIMIT_DEFAULT: str = "300/minute"
+    RATE_LIMIT_ROUTES: dict[str, str] = Field(default={
+        "POST /users/login": "10/minute",
+        "POST /users/register": "5/minute",
+        "GET /stocks/": "120/minute",
+    }, description="Per-route budgets keyed by 'METHOD path' or path")
+    RATE_LIMIT_SWEEP_INTERVAL: float = 60.0
+    # Orchestrator probes must never be throttled
+    RATE_LIMIT_EXEMPT_PATHS: list[str] = ["/health", "/health/live", "/health/ready"]
+    LOAD_SHED_MAX_IN_FLIGHT: int = 256
+    LOAD_SHED_MAX_LOOP_LAG: float = 0.5  # seconds of smoothed event-loop lag
+    LOAD_SHED_RETRY_AFTER: int = 1
+    LOAD_SHED_EXEMPT_PATHS: list[str] = ["/health", "/health/live", "/health/ready"]
+    
+    # Tick-to-bar aggregation settings
+    BAR_GRACE_SECONDS: float = 5.0  # how late an out-of-order tick may arrive
+    BAR_FLUSH_INTERVAL: float = 5.0
+    BAR_MAX_PENDING: int = 100_000  # closed bars held while storage is unavailable
+    
+    # Write-behind buffering of Stock price fields
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_FLUSH_INTERVAL: float = 1.0
+    WRITE_BEHIND_MAX_PENDING: int = 5000  # dirty symbols that trigger an early flush
+    
+    # Screener snapshot settings, for warm restarts
+    SNAPSHOT_ENABLED: bool = False
+    SNAPSHOT_PATH: str = "data/screener.snapshot"
+    SNAPSHOT_INTERVAL: float = 300.0
+    SNAPSHOT_REPLAY_MARGIN: float = 60.0  # seconds replayed before the high-water mark
+    
+    # Cross-worker cache invalidation settings
+    INVALIDATION_BUS_ENABLED: bool = True
+    CHANGE_STREAM_POLL_INTERVAL: float = 2.0  # fallback when change streams are unavailable
+    CHANGE_STREAM_MAX_BACKOFF: float = 30.0
+    
+    # Query diagnostics settings
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    QUERY_AUDIT_ON_STARTUP: bool = False
+    
+    # Request profiling settings
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of requests profiled without X-Profile
+    PROFILING_MAX_PROFILES: int = 50
+    
+    # User profile cache settings
+    PROFILE_CACHE_MAX_ENTRIES: int = 100_000
+    
+    # Health check settings
+    HEALTH_PROBE_INTERVAL: float = 5.0  # seconds between cached MongoDB pings
+    HEALTH_PROBE_TIMEOUT: float = 2.0
+    HEALTH_PROBE_MAX_AGE: float = 15.0  # older probe results count as failing
+    HEALTH_LIVE_MAX_LOOP_LAG: float = 5.0  # seconds of smoothed lag before liveness fails
+    HEALTH_LOOP_LAG_DEGRADED: float = 0.1
+    HEALTH_LOOP_LAG_FAILING: float = 0.5
+    HEALTH_DB_LATENCY_DEGRADED_MS: float = 100.0
+    HEALTH_POOL_UTILIZATION_DEGRADED: float = 0.8  # checked-out share of maxPoolSize
+    
+    # Notification digest settings
+    DIGEST_SENDER: str = "file"  # file or smtp
+    DIGEST_OUTBOX_DIR: str = "data/outbox"
+    DIGEST_FROM: str = "digest@stock-tracker.local"
+    DIGEST_BATCH_SIZE: int = 5000
+    DIGEST_CONCURRENCY: int = 32
+    DIGEST_MAX_RETRIES: int = 3
+    DIGEST_ALERT_THRESHOLD: float = 5.0  # percent move that triggers a price alert
+    DIGEST_SUMMARY_CACHE_SIZE: int = 100_000  # rendered summaries kept per run
+    DIGEST_MIN_INTERVAL_HOURS: float = 20.0  # users digested more recently are skipped, so reruns resume
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 1025
+    SMTP_USERNAME: str = ""
+    SMTP_PASSWORD: str = ""
+    SMTP_USE_TLS: bool = False
     
     # Environment settings
     # ENV: str = "local"
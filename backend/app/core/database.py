@@ -1,13 +1,22 @@
 from mongoengine import connect, disconnect
 from app.core.config import settings
+from app.core.slow_query_log import slow_query_log
+from app.core.health import pool_stats
+from app.middleware.profiling import profile_db_timer
 
 
 def connect_to_mongo():
     """Create database connection"""
+    event_listeners = [pool_stats]
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        event_listeners.append(slow_query_log)
+    if settings.PROFILING_ENABLED:
+        event_listeners.append(profile_db_timer)
     connect(
         db=settings.mongodb_database,
         host=settings.mongodb_url,
-        alias='default'
+        alias='default',
+        event_listeners=event_listeners
     )
     print(f"Connected to MongoDB: {settings.mongodb_database}")
 
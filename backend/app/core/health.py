@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from mongoengine.connection import get_connection
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.utils.loop_monitor import loop_monitor
+
+
+OK = "ok"
+DEGRADED = "degraded"
+FAILING = "failing"
+SEVERITY = {OK: 0, DEGRADED: 1, FAILING: 2}
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters from pymongo CMAP events"""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self._lock = threading.Lock()
+
+    def _add(self, field: str, delta: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def connection_created(self, event):
+        self._add('open', 1)
+
+    def connection_closed(self, event):
+        self._add('open', -1)
+
+    def connection_checked_out(self, event):
+        self._add('checked_out', 1)
+
+    def connection_checked_in(self, event):
+        self._add('checked_out', -1)
+
+    def connection_check_out_failed(self, event):
+        self._add('checkout_failures', 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+pool_stats = PoolStats()
+
+
+class MongoHealthProbe:
+    """Ping MongoDB on a fixed interval and cache the result
+
+    Health endpoints read the cached result, so probes from the
+    orchestrator never add database load. A ping that outlives
+    HEALTH_PROBE_TIMEOUT counts as a failure; its thread is not
+    restarted until it returns.
+    """
+
+    def __init__(self, interval: float = None, timeout: float = None):
+        self.interval = interval or settings.HEALTH_PROBE_INTERVAL
+        self.timeout = timeout or settings.HEALTH_PROBE_TIMEOUT
+        self.ok = False
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[datetime] = None
+        self.last_ok_at: Optional[datetime] = None
+        self.consecutive_failures = 0
+        self.error: Optional[str] = None
+        self._checked_monotonic: Optional[float] = None
+        self._pending: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _ping() -> float:
+        started = time.perf_counter()
+        get_connection().admin.command('ping')
+        return (time.perf_counter() - started) * 1000
+
+    async def probe(self):
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.ensure_future(asyncio.to_thread(self._ping))
+        try:
+            self.latency_ms = await asyncio.wait_for(asyncio.shield(self._pending), self.timeout)
+            self.ok = True
+            self.error = None
+            self.consecutive_failures = 0
+            self.last_ok_at = datetime.utcnow()
+        except Exception as e:
+            self.ok = False
+            self.consecutive_failures += 1
+            self.error = f"ping timed out after {self.timeout}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+        self.checked_at = datetime.utcnow()
+        self._checked_monotonic = time.monotonic()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.probe()
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        try:
+            max_pool_size = get_connection().options.pool_options.max_pool_size
+        except Exception:
+            max_pool_size = None
+        return {
+            'ok': self.ok,
+            'latency_ms': self.latency_ms,
+            'checked_at': self.checked_at,
+            'last_ok_at': self.last_ok_at,
+            'consecutive_failures': self.consecutive_failures,
+            'error': self.error,
+            'pool': {
+                'open': pool_stats.open,
+                'checked_out': pool_stats.checked_out,
+                'max_pool_size': max_pool_size,
+                'checkout_failures': pool_stats.checkout_failures,
+            },
+        }
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last completed probe"""
+        if self._checked_monotonic is None:
+            return None
+        return time.monotonic() - self._checked_monotonic
+
+
+mongo_probe = MongoHealthProbe()
+
+
+def _worst(*statuses: str) -> str:
+    return max(statuses, key=SEVERITY.__getitem__)
+
+
+def _threshold(value: float, degraded: float, failing: float) -> str:
+    if value >= failing:
+        return FAILING
+    if value >= degraded:
+        return DEGRADED
+    return OK
+
+
+def liveness() -> dict:
+    """Whether the process can make progress; never depends on the database"""
+    lag = loop_monitor.smoothed_lag
+    status = FAILING if lag >= settings.HEALTH_LIVE_MAX_LOOP_LAG else OK
+    return {'status': status, 'checks': {'event_loop': {'status': status, 'smoothed_lag': lag}}}
+
+
+def readiness() -> dict:
+    """Whether the process should receive traffic, from cached probe results"""
+    lag = loop_monitor.smoothed_lag
+    loop_status = _threshold(lag, settings.HEALTH_LOOP_LAG_DEGRADED, settings.HEALTH_LOOP_LAG_FAILING)
+
+    database = mongo_probe.stats()
+    age = mongo_probe.age()
+    if age is None or age > settings.HEALTH_PROBE_MAX_AGE or not mongo_probe.ok:
+        database_status = FAILING
+    else:
+        database_status = _threshold(
+            mongo_probe.latency_ms, settings.HEALTH_DB_LATENCY_DEGRADED_MS, float('inf')
+        )
+        pool = database['pool']
+        if pool['max_pool_size']:
+            utilization = pool['checked_out'] / pool['max_pool_size']
+            database_status = _worst(database_status, _threshold(
+                utilization, settings.HEALTH_POOL_UTILIZATION_DEGRADED, float('inf')
+            ))
+
+    return {
+        'status': _worst(loop_status, database_status),
+        'checks': {
+            'event_loop': {
+                'status': loop_status,
+                'smoothed_lag': lag,
+                'p99': loop_monitor.quantile(0.99),
+            },
+            'database': {'status': database_status, 'probe_age': age, **database},
+        },
+    }
@@ -0,0 +1,93 @@
+import os
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+from pymongo import monitoring
+
+from app.core.config import settings
+
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHAPE_ARGUMENTS = ('filter', 'sort', 'projection', 'pipeline', 'updates', 'deletes', 'q', 'u', 'query')
+
+
+def query_shape(value):
+    """Replace literal values with 1, keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Keep structure for pipelines and bulk ops, collapse plain value lists
+        shapes = [query_shape(item) for item in value[:3]]
+        return shapes if any(isinstance(item, (dict, list)) for item in shapes) else 1
+    return 1
+
+
+def _calling_method() -> Optional[str]:
+    """Innermost application frame outside this module, e.g. StockService._load_stocks"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_ROOT) and filename != __file__:
+            owner = frame.f_locals.get('self')
+            name = frame.f_code.co_name
+            return f"{type(owner).__name__}.{name}" if owner is not None else f"{frame.f_globals.get('__name__')}.{name}"
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    """pymongo command listener that records commands slower than a threshold
+
+    Only a reference to each command is kept while it runs; the shape and
+    calling method are computed for slow commands only. Synchronous pymongo
+    publishes completion on the calling thread, so the caller's frames are
+    still on the stack.
+    """
+
+    def __init__(self, threshold_ms: float, max_entries: int = 200):
+        self.threshold_ms = threshold_ms
+        self.slow_queries = 0
+        self.entries: Deque[dict] = deque(maxlen=max_entries)
+        self._running: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._running[event.request_id] = event.command
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self._lock:
+            command = self._running.pop(event.request_id, None)
+        duration_ms = event.duration_micros / 1000
+        if command is None or duration_ms < self.threshold_ms:
+            return
+
+        entry = {
+            'at': datetime.utcnow(),
+            'command': event.command_name,
+            'collection': command.get(event.command_name),
+            'shape': {key: query_shape(command[key]) for key in SHAPE_ARGUMENTS if key in command},
+            'duration_ms': duration_ms,
+            'method': _calling_method(),
+        }
+        self.slow_queries += 1
+        self.entries.append(entry)
+        print(
+            f"Slow query {duration_ms:.1f}ms {entry['command']} {entry['collection']} "
+            f"{entry['shape']} from {entry['method']}"
+        )
+
+    def recent(self) -> list:
+        return list(self.entries)
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_THRESHOLD_MS)
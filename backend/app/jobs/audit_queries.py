@@ -0,0 +1,22 @@
+"""Explain the canonical query of every service method and flag bad plans.
+
+Run with: python -m app.jobs.audit_queries
+Exits non-zero when a query uses a COLLSCAN or an in-memory sort.
+"""
+import sys
+
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.utils.query_audit import audit_queries, report
+
+
+def main():
+    connect_to_mongo()
+    try:
+        flagged = report(audit_queries())
+    finally:
+        close_mongo_connection()
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
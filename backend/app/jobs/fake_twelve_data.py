@@ -0,0 +1,128 @@
+"""Local fake of the Twelve Data /quote and /time_series endpoints.
+
+Serves simulated prices so the app, CI and capacity tests run without a
+live feed. Point the app at it with TWELVE_DATA_BASE_URL=http://localhost:8100.
+
+Run with: python -m app.jobs.fake_twelve_data [--port 8100] [--instruments N] [--seed S]
+"""
+import argparse
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Query
+
+from app.core.config import settings
+from app.services.market_simulator import MarketSimulator
+from app.services.stock_service import StockService
+
+
+# Twelve Data interval names -> bar length in seconds
+TIME_SERIES_INTERVALS = {
+    '1min': 60, '5min': 300, '15min': 900, '30min': 1800, '45min': 2700,
+    '1h': 3600, '2h': 7200, '4h': 14400, '1day': 86400, '1week': 604800,
+}
+
+
+def _not_found(symbol: str) -> dict:
+    return {'code': 404, 'message': f"**symbol** {symbol} not found", 'status': 'error'}
+
+
+def _by_symbol(symbols: str, render) -> dict:
+    """Single symbols return the payload itself; lists return a mapping, as Twelve Data does"""
+    names = [name.strip().upper() for name in symbols.split(',') if name.strip()]
+    if len(names) == 1:
+        return render(names[0])
+    return {name: render(name) for name in names}
+
+
+def create_app(simulator: MarketSimulator) -> FastAPI:
+    app = FastAPI(title="Fake Twelve Data")
+
+    @app.get("/quote")
+    async def quote(symbol: str, apikey: str = None):
+        simulator.advance_clock()
+        now = datetime.now(timezone.utc)
+
+        def render(name: str) -> dict:
+            i = simulator.index.get(name)
+            if i is None:
+                return _not_found(name)
+            price = float(simulator.prices[i])
+            previous_close = float(simulator.previous_close[i])
+            return {
+                'symbol': name,
+                'name': simulator.names[i],
+                'exchange': 'SIM',
+                'currency': 'USD',
+                'datetime': now.strftime('%Y-%m-%d'),
+                'timestamp': int(now.timestamp()),
+                'close': f"{price:.5f}",
+                'previous_close': f"{previous_close:.5f}",
+                'change': f"{price - previous_close:.5f}",
+                'percent_change': f"{(price / previous_close - 1) * 100:.5f}",
+                'volume': str(int(simulator.volumes[i])),
+                'is_market_open': True,
+            }
+
+        return _by_symbol(symbol, render)
+
+    @app.get("/time_series")
+    async def time_series(
+        symbol: str,
+        interval: str = '1min',
+        outputsize: int = Query(30, ge=1, le=5000),
+        apikey: str = None
+    ):
+        if interval not in TIME_SERIES_INTERVALS:
+            return {'code': 400, 'message': f"**interval** {interval} is not supported", 'status': 'error'}
+        simulator.advance_clock()
+        bar_seconds = TIME_SERIES_INTERVALS[interval]
+        time_format = '%Y-%m-%d' if bar_seconds >= 86400 else '%Y-%m-%d %H:%M:%S'
+
+        def render(name: str) -> dict:
+            if name not in simulator.index:
+                return _not_found(name)
+            bars = simulator.history(name, outputsize, bar_seconds)
+            return {
+                'meta': {'symbol': name, 'interval': interval, 'currency': 'USD', 'exchange': 'SIM'},
+                # Newest first, values as strings
+                'values': [
+                    {
+                        'datetime': datetime.fromtimestamp(bar['ts'], timezone.utc).strftime(time_format),
+                        'open': f"{bar['open']:.5f}",
+                        'high': f"{bar['high']:.5f}",
+                        'low': f"{bar['low']:.5f}",
+                        'close': f"{bar['close']:.5f}",
+                        'volume': str(bar['volume']),
+                    }
+                    for bar in reversed(bars)
+                ],
+                'status': 'ok',
+            }
+
+        return _by_symbol(symbol, render)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve simulated quotes in the Twelve Data API shape")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--instruments", type=int, default=settings.SIMULATOR_INSTRUMENTS)
+    parser.add_argument("--seed", type=int, default=settings.SIMULATOR_SEED)
+    parser.add_argument("--step-seconds", type=float, default=settings.SIMULATOR_STEP_SECONDS)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    simulator = MarketSimulator(
+        instruments=args.instruments,
+        seed=args.seed,
+        step_seconds=args.step_seconds,
+        seed_companies=StockService.PREDEFINED_COMPANIES
+    )
+    uvicorn.run(create_app(simulator), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
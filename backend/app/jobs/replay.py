@@ -0,0 +1,73 @@
+"""Replay stored price bars and run backtest strategies against them.
+
+Run with: python -m app.jobs.replay AAPL MSFT [--interval 1m] [--start 2024-01-01]
+    [--end 2025-01-01] [--speed 60] [--sink dry-run|stocks] [--strategy module:Class] [--stream]
+"""
+import argparse
+import asyncio
+import importlib
+from datetime import datetime
+
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.services.bar_aggregator import INTERVALS
+from app.services.replay_engine import (
+    BuyAndHoldStrategy,
+    DryRunSink,
+    ReplayEngine,
+    StockServiceSink,
+)
+
+
+def load_strategy(path: str):
+    """Instantiate a strategy from a module:Class path"""
+    module_name, _, class_name = path.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay price history through a sink and strategies")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--interval", choices=INTERVALS, default="1m")
+    parser.add_argument("--start", type=datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.fromisoformat)
+    parser.add_argument("--speed", type=float, help="Multiple of real time; omit to replay as fast as possible")
+    parser.add_argument("--sink", choices=["dry-run", "stocks"], default="dry-run")
+    parser.add_argument("--strategy", action="append", help="module:Class, may be repeated")
+    parser.add_argument("--cash", type=float, default=100_000.0)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Merge bar cursors lazily instead of loading every bar into memory"
+    )
+    args = parser.parse_args()
+
+    strategies = [load_strategy(path) for path in args.strategy] if args.strategy else [BuyAndHoldStrategy()]
+    connect_to_mongo()
+    try:
+        engine = ReplayEngine(
+            args.symbols,
+            interval=args.interval,
+            start=args.start,
+            end=args.end,
+            speed=args.speed,
+            sink=StockServiceSink() if args.sink == "stocks" else DryRunSink(),
+            strategies=strategies,
+            cash=args.cash,
+            commission=args.commission,
+            vectorized=not args.stream
+        )
+        result = asyncio.run(engine.run())
+        print(
+            f"Replayed {result['ticks']} ticks in {result['elapsed_seconds']:.1f}s "
+            f"({result['ticks_per_second']:,.0f} ticks/s)"
+        )
+        print(
+            f"{result['fills']} fills, realized P&L {result['realized_pnl']:.2f}, "
+            f"unrealized P&L {result['unrealized_pnl']:.2f}, equity {result['equity']:.2f}"
+        )
+    finally:
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    main()
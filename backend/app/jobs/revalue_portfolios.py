@@ -0,0 +1,29 @@
+"""Nightly batch revaluation of every portfolio.
+
+Run with: python -m app.jobs.revalue_portfolios [--chunk-size N]
+"""
+import argparse
+import asyncio
+
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.services.portfolio_service import PortfolioService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Revalue all portfolios")
+    parser.add_argument("--chunk-size", type=int, default=PortfolioService.REVALUE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    try:
+        result = asyncio.run(PortfolioService().revalue_all(chunk_size=args.chunk_size))
+        print(
+            f"Revalued {result['portfolios']} portfolios "
+            f"({result['positions']} positions) in {result['elapsed_seconds']:.1f}s"
+        )
+    finally:
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Nightly watchlist digest emails.
+
+Run with: python -m app.jobs.send_digests [--sender file|smtp] [--batch-size N] [--concurrency N]
+    [--min-interval-hours H]
+"""
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.services.digest_service import DIGEST_SENDERS, DigestService, get_digest_sender
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send watchlist digests to all active users")
+    parser.add_argument("--sender", choices=list(DIGEST_SENDERS), default=settings.DIGEST_SENDER)
+    parser.add_argument("--batch-size", type=int, default=settings.DIGEST_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.DIGEST_CONCURRENCY)
+    parser.add_argument(
+        "--min-interval-hours", type=float, default=settings.DIGEST_MIN_INTERVAL_HOURS,
+        help="Skip users digested within this many hours; 0 sends to everyone again"
+    )
+    args = parser.parse_args()
+
+    connect_to_mongo()
+    try:
+        service = DigestService(
+            sender=get_digest_sender(args.sender, concurrency=args.concurrency),
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            min_interval_hours=args.min_interval_hours
+        )
+        result = asyncio.run(service.run())
+        print(
+            f"Sent {result['sent']} digests to {result['users']} users "
+            f"({result['skipped']} skipped, {result['failed']} failed, {result['retries']} retries) "
+            f"from {result['summaries_computed']} watchlist summaries in {result['elapsed_seconds']:.1f}s"
+        )
+    finally:
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,74 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.database import connect_to_mongo, close_mongo_connection
-from app.routers import stock, user
+from app.routers import stock, user, monitoring, health
 from app.middleware.auth import authorize_token
+from app.middleware.rate_limit import rate_limiter, load_shedder
+from app.middleware.profiling import request_profiler
+from app.services.quote_scheduler import QuoteRefreshScheduler
+from app.services.quote_source import get_quote_source
+from app.services.bar_aggregator import bar_aggregator
+from app.services.write_buffer import price_write_buffer
+from app.services.snapshot import SnapshotManager
+from app.services.invalidation_bus import ChangeStreamManager, invalidation_bus
+from app.services.stock_screener import stock_screener
+from app.services.profile_cache import profile_cache
+from app.utils.loop_monitor import loop_monitor
+from app.core.health import mongo_probe
+from app.utils.query_audit import audit_queries, report
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     connect_to_mongo()
+    if settings.QUERY_AUDIT_ON_STARTUP:
+        try:
+            flagged = report(await asyncio.to_thread(audit_queries))
+            if flagged:
+                print(f"Query audit flagged {flagged} queries, see recommendations above")
+        except Exception as e:
+            print(f"Query audit failed: {e}")
+    loop_monitor.start()
+    mongo_probe.start()
+    bar_aggregator.start()
+    if settings.WRITE_BEHIND_ENABLED:
+        price_write_buffer.start()
+    app.state.change_streams = None
+    if settings.INVALIDATION_BUS_ENABLED:
+        invalidation_bus.subscribe('stocks', stock_screener.handle_invalidation)
+        invalidation_bus.subscribe('users', profile_cache.handle_invalidation)
+        app.state.change_streams = ChangeStreamManager(['stocks', 'users'])
+        app.state.change_streams.start()
+    app.state.snapshots = None
+    if settings.SNAPSHOT_ENABLED:
+        # Catch-up replay must start after change streams are live, so no
+        # write lands between the replay query and the first streamed event
+        if app.state.change_streams is not None and not await app.state.change_streams.wait_ready():
+            print("Change streams not ready, snapshot catch-up may miss concurrent writes")
+        app.state.snapshots = SnapshotManager()
+        await app.state.snapshots.restore()
+        app.state.snapshots.start()
+    app.state.quote_scheduler = None
+    if settings.QUOTE_REFRESH_ENABLED:
+        app.state.quote_scheduler = QuoteRefreshScheduler(get_quote_source())
+        app.state.quote_scheduler.start()
     yield
     # Shutdown
+    if app.state.quote_scheduler is not None:
+        await app.state.quote_scheduler.stop()
+    # Always flush, even if buffering was switched off with writes pending
+    await price_write_buffer.stop()
+    if app.state.change_streams is not None:
+        await app.state.change_streams.stop()
+    if app.state.snapshots is not None:
+        await app.state.snapshots.stop()
+    await bar_aggregator.stop()
+    await mongo_probe.stop()
+    await loop_monitor.stop()
     close_mongo_connection()
 
 
@@ -32,17 +88,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Middleware added later runs first: load shedding, then auth, then
+# rate limiting so it can key on the authenticated user
+app.middleware("http")(rate_limiter)
 app.middleware("http")(authorize_token)
+app.middleware("http")(load_shedder)
+if settings.PROFILING_ENABLED:
+    # Outermost, so middleware time is part of the profile
+    app.middleware("http")(request_profiler)
 # Include routers
 app.include_router(stock.router, prefix="/stocks", tags=["stocks"])
 app.include_router(user.router, prefix="/users", tags=["users"])
+app.include_router(monitoring.router, prefix="/monitoring", tags=["monitoring"])
+app.include_router(health.router, prefix="/health", tags=["health"])
 
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Stock Market Backend API"}
-
-
-@app.get("/health")
-async def health():
-    return {"status": "healthy", "database": "connected"}
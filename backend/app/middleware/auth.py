@@ -1,4 +1,6 @@
 
+from typing import Optional
+
 from fastapi import HTTPException
 from starlette.requests import Request
 import jwt
@@ -8,8 +10,37 @@ from app.core.config import Settings
 settings = Settings()
 
 
+def _token_user(decoded_token: dict) -> dict:
+    # Tokens only carry identity and profile version; the profile itself
+    # comes from the profile cache
+    return {
+        "id": decoded_token.get('user_id', decoded_token.get('id')),
+        "version": decoded_token.get('ver', 0)
+    }
+
+
+def bearer_user(request: Request) -> Optional[dict]:
+    """Identity from a valid bearer token, or None; never raises
+
+    For middleware that runs outside authorize_token and must know the
+    caller before doing any work on its behalf.
+    """
+    authorization = request.headers.get('authorization') or ''
+    if not authorization.startswith("Bearer "):
+        return None
+    try:
+        decoded_token = jwt.decode(
+            authorization.split("Bearer ")[1],
+            settings.JWT_SECRET_KEY,
+            algorithms=[settings.JWT_ALGORITHM],
+        )
+    except jwt.InvalidTokenError:
+        return None
+    return _token_user(decoded_token) if decoded_token else None
+
+
 async def authorize_token(request: Request, call_next):
-    excluded_paths = ["/health", "/", "/docs", "/openapi.json", "/users/login", "/users/register", '/stocks/companies']
+    excluded_paths = ["/health", "/health/live", "/health/ready", "/", "/docs", "/openapi.json", "/users/login", "/users/register", '/stocks/companies']
     if request.url.path in excluded_paths or request.method == "OPTIONS":
         response = await call_next(request)
         return response
@@ -36,14 +67,7 @@ async def authorize_token(request: Request, call_next):
         if not decoded_token:
             raise HTTPException(status_code=401, detail="Invalid or expired token")
         
-        # Add user info to request state
-        request.state.user = {
-            "id": decoded_token.get('user_id', decoded_token.get('id')),
-            "name": decoded_token.get('name'),
-            "email": decoded_token.get('email'),
-            "watchlist": decoded_token.get('watchlist', []),
-            "preferred_sectors": decoded_token.get('preferred_sectors', [])
-        }
+        request.state.user = _token_user(decoded_token)
         print('request.state.user', request.state.user)
         return await call_next(request)
     except jwt.ExpiredSignatureError:
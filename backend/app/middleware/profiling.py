@@ -0,0 +1,186 @@
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import monitoring
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.middleware.auth import bearer_user
+from app.services.user_service import UserService
+
+
+PROFILE_HEADER = "x-profile"
+
+# (filename suffix, function name) -> breakdown bucket, measured as cumulative time
+CUMULATIVE_BUCKETS = {
+    ('fastapi/dependencies/utils.py', 'solve_dependencies'): 'validation_ms',
+    ('fastapi/routing.py', 'serialize_response'): 'serialization_ms',
+    ('starlette/responses.py', 'render'): 'serialization_ms',
+    ('fastapi/routing.py', 'run_endpoint_function'): 'endpoint_ms',
+}
+# Code whose own time counts as middleware time
+MIDDLEWARE_PATHS = ('app/middleware/', 'starlette/middleware/')
+
+
+class _ProfileRecord:
+    __slots__ = ('db_ms', 'db_commands')
+
+    def __init__(self):
+        self.db_ms = 0.0
+        self.db_commands = 0
+
+
+current_profile: ContextVar[Optional[_ProfileRecord]] = ContextVar('current_profile', default=None)
+
+
+class ProfileDbTimer(monitoring.CommandListener):
+    """Attribute MongoDB command time to the request being profiled
+
+    asyncio.to_thread copies the context, so commands run in worker
+    threads still see the request's profile record.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    @staticmethod
+    def _record(event):
+        record = current_profile.get()
+        if record is not None:
+            record.db_ms += event.duration_micros / 1000
+            record.db_commands += 1
+
+
+profile_db_timer = ProfileDbTimer()
+
+
+def _breakdown(stats: pstats.Stats) -> Dict[str, float]:
+    breakdown = {'middleware_ms': 0.0, 'validation_ms': 0.0, 'serialization_ms': 0.0, 'endpoint_ms': 0.0}
+    for (filename, _, function), (_, _, own_time, cumulative, _) in stats.stats.items():
+        filename = filename.replace('\\', '/')
+        for (suffix, name), bucket in CUMULATIVE_BUCKETS.items():
+            if function == name and filename.endswith(suffix):
+                breakdown[bucket] += cumulative * 1000
+        if any(path in filename for path in MIDDLEWARE_PATHS):
+            breakdown['middleware_ms'] += own_time * 1000
+    return breakdown
+
+
+async def is_admin_request(request: Request) -> bool:
+    """Whether the request's bearer token belongs to an admin
+
+    Decodes the token itself, since this middleware runs outside
+    authorize_token.
+    """
+    user = getattr(request.state, 'user', None) or bearer_user(request)
+    if not user or not user.get('id'):
+        return False
+    db_user = await UserService().get_profile(user['id'], user.get('version', 0))
+    return bool(db_user and db_user.is_admin)
+
+
+class RequestProfiler:
+    """Opt-in per-request profiling for admins, plus optional sampling
+
+    A request is profiled when it carries an X-Profile header from an
+    admin, or when sampling picks it. The admin check runs before the
+    profiler is enabled, so other callers cannot force profiling overhead
+    or hold the profiling slot. Only one request is profiled at a
+    time; concurrent candidates are served unprofiled, which bounds the
+    overhead. Other coroutines interleaved on the event loop while a
+    profile is active show up in its CPU profile.
+
+    The middleware is only installed when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, sample_rate: float, max_profiles: int):
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        self.profiles: "OrderedDict[str, dict]" = OrderedDict()
+        self._active = False
+
+    async def __call__(self, request: Request, call_next):
+        requested = PROFILE_HEADER in request.headers
+        sampled = not requested and self.sample_rate and random.random() < self.sample_rate
+        if not (requested or sampled) or self._active:
+            return await call_next(request)
+        if requested and not await is_admin_request(request):
+            return await call_next(request)
+        if self._active:
+            # Taken while the admin check awaited
+            return await call_next(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this interpreter
+            return await call_next(request)
+
+        self._active = True
+        record = _ProfileRecord()
+        token = current_profile.set(record)
+        started_wall = time.perf_counter()
+        started_cpu = time.process_time()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+            wall_ms = (time.perf_counter() - started_wall) * 1000
+            cpu_ms = (time.process_time() - started_cpu) * 1000
+            current_profile.reset(token)
+            self._active = False
+
+        profile_id = uuid.uuid4().hex
+        stats = pstats.Stats(profiler)
+        self._store(profile_id, {
+            'id': profile_id,
+            'at': datetime.utcnow(),
+            'method': request.method,
+            'path': request.url.path,
+            'status_code': response.status_code,
+            'trigger': 'header' if requested else 'sample',
+            'wall_ms': wall_ms,
+            'cpu_ms': cpu_ms,
+            'db_ms': record.db_ms,
+            'db_commands': record.db_commands,
+            **_breakdown(stats),
+        }, stats)
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    def _store(self, profile_id: str, summary: dict, stats: pstats.Stats):
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats('cumulative').print_stats(40)
+        self.profiles[profile_id] = {
+            'summary': summary,
+            'report': text.getvalue(),
+            'pstats': marshal.dumps(stats.stats),
+        }
+        while len(self.profiles) > self.max_profiles:
+            self.profiles.popitem(last=False)
+
+    def list(self) -> list:
+        return [entry['summary'] for entry in reversed(self.profiles.values())]
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        return self.profiles.get(profile_id)
+
+
+request_profiler = RequestProfiler(settings.PROFILING_SAMPLE_RATE, settings.PROFILING_MAX_PROFILES)
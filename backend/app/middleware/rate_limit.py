@@ -0,0 +1,156 @@
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.utils.loop_monitor import loop_monitor
+
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Parse a budget like '120/minute' into (limit, period in seconds)"""
+    limit, _, period = rate.partition('/')
+    return int(limit), float(PERIODS[period.strip().lower()])
+
+
+class RateLimiter:
+    """Per-user, per-route rate limiting with GCRA
+
+    Each (route, client) key stores only its theoretical arrival time, so
+    memory is O(1) per active key. A key whose arrival time has passed is
+    indistinguishable from a fresh one and is evicted by a periodic sweep.
+    Clients are identified by the user id that authorize_token puts on
+    request.state, or by IP for unauthenticated paths.
+    """
+
+    def __init__(
+        self,
+        default_rate: str,
+        route_rates: Dict[str, str],
+        sweep_interval: float = 60.0,
+        exempt_paths: Optional[list] = None
+    ):
+        self.default = self._budget(default_rate)
+        self.routes = {route: self._budget(rate) for route, rate in route_rates.items()}
+        self.sweep_interval = sweep_interval
+        self.exempt_paths = set(exempt_paths or [])
+        self.rejected = 0
+        self._tat: Dict[Tuple[str, str], float] = {}
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def _budget(rate: str) -> Tuple[float, float]:
+        """Emission interval and burst tolerance for a rate; bursts of up to `limit` are allowed"""
+        limit, period = parse_rate(rate)
+        emission_interval = period / limit
+        return emission_interval, period - emission_interval
+
+    def _route_budget(self, request: Request) -> Tuple[str, Tuple[float, float]]:
+        path = request.url.path
+        for route in (f"{request.method} {path}", path):
+            if route in self.routes:
+                return route, self.routes[route]
+        return '*', self.default
+
+    @staticmethod
+    def _client(request: Request) -> str:
+        user = getattr(request.state, 'user', None)
+        if user and user.get('id'):
+            return f"user:{user['id']}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    def hit(self, key: Tuple[str, str], budget: Tuple[float, float], now: float) -> float:
+        """Register one request; returns 0 if allowed, otherwise seconds to wait"""
+        emission_interval, tolerance = budget
+        tat = max(self._tat.get(key, now), now)
+        if tat - now > tolerance:
+            return tat - tolerance - now
+        self._tat[key] = tat + emission_interval
+        return 0.0
+
+    def _sweep(self, now: float):
+        self._tat = {key: tat for key, tat in self._tat.items() if tat > now}
+        self._last_sweep = now
+
+    async def __call__(self, request: Request, call_next):
+        if request.method == "OPTIONS" or request.url.path in self.exempt_paths:
+            return await call_next(request)
+
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+
+        route, budget = self._route_budget(request)
+        retry_after = self.hit((route, self._client(request)), budget, now)
+        if retry_after > 0:
+            self.rejected += 1
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+        return await call_next(request)
+
+    def stats(self) -> dict:
+        return {'active_keys': len(self._tat), 'rejected': self.rejected}
+
+
+class LoadShedder:
+    """Reject requests with 503 when the process is overloaded
+
+    Sheds when concurrent in-flight requests or smoothed event-loop lag
+    exceed their thresholds, so excess load fails fast instead of queueing.
+    """
+
+    def __init__(self, max_in_flight: int, max_loop_lag: float, retry_after: int, exempt_paths: list):
+        self.max_in_flight = max_in_flight
+        self.max_loop_lag = max_loop_lag
+        self.retry_after = retry_after
+        self.exempt_paths = set(exempt_paths)
+        self.in_flight = 0
+        self.shed = 0
+
+    def _overloaded(self) -> bool:
+        return self.in_flight >= self.max_in_flight or loop_monitor.smoothed_lag > self.max_loop_lag
+
+    async def __call__(self, request: Request, call_next):
+        if request.url.path in self.exempt_paths:
+            return await call_next(request)
+        if self._overloaded():
+            self.shed += 1
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Service overloaded"},
+                headers={"Retry-After": str(self.retry_after)}
+            )
+        self.in_flight += 1
+        try:
+            return await call_next(request)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': self.in_flight,
+            'shed': self.shed,
+            'loop_lag_seconds': loop_monitor.smoothed_lag,
+        }
+
+
+rate_limiter = RateLimiter(
+    settings.RATE_LIMIT_DEFAULT,
+    settings.RATE_LIMIT_ROUTES,
+    sweep_interval=settings.RATE_LIMIT_SWEEP_INTERVAL,
+    exempt_paths=settings.RATE_LIMIT_EXEMPT_PATHS
+)
+load_shedder = LoadShedder(
+    max_in_flight=settings.LOAD_SHED_MAX_IN_FLIGHT,
+    max_loop_lag=settings.LOAD_SHED_MAX_LOOP_LAG,
+    retry_after=settings.LOAD_SHED_RETRY_AFTER,
+    exempt_paths=settings.LOAD_SHED_EXEMPT_PATHS
+)
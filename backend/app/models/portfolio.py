@@ -0,0 +1,67 @@
+from mongoengine import (
+    Document,
+    EmbeddedDocument,
+    StringField,
+    FloatField,
+    DateTimeField,
+    DictField,
+    ListField,
+    EmbeddedDocumentField
+)
+from datetime import datetime
+
+
+class Lot(EmbeddedDocument):
+    """A single purchase of a position"""
+    quantity = FloatField(required=True, min_value=0)
+    price = FloatField(required=True, min_value=0)
+    acquired_at = DateTimeField(default=datetime.utcnow)
+
+
+class Holding(EmbeddedDocument):
+    """Position in one symbol; quantity and cost_basis are totals over lots"""
+    symbol = StringField(required=True, max_length=10)
+    quantity = FloatField(default=0, min_value=0)
+    cost_basis = FloatField(default=0, min_value=0)
+    lots = ListField(EmbeddedDocumentField(Lot))
+
+    def add_lot(self, lot: Lot):
+        """Append a lot and keep the denormalized totals in sync"""
+        self.lots.append(lot)
+        self.quantity += lot.quantity
+        self.cost_basis += lot.quantity * lot.price
+
+
+class Portfolio(Document):
+    """Portfolio holdings for a User"""
+    user_id = StringField(required=True, unique=True)
+    holdings = ListField(EmbeddedDocumentField(Holding))
+
+    # Last result of the nightly batch revaluation
+    valuation = DictField()
+    valued_at = DateTimeField()
+
+    created_at = DateTimeField(default=datetime.utcnow)
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'portfolios',
+        'indexes': [
+            'user_id',
+            'holdings.symbol'
+        ]
+    }
+
+    def get_holding(self, symbol: str):
+        for holding in self.holdings:
+            if holding.symbol == symbol:
+                return holding
+        return None
+
+    def __str__(self):
+        return f"Portfolio(user_id={self.user_id}, holdings={len(self.holdings)})"
+
+    def save(self, *args, **kwargs):
+        """Override save to update updated_at timestamp"""
+        self.updated_at = datetime.utcnow()
+        return super().save(*args, **kwargs)
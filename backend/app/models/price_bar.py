@@ -0,0 +1,28 @@
+from mongoengine import Document, StringField, FloatField, IntField, DateTimeField
+
+
+class PriceBar(Document):
+    """OHLCV bar for one symbol over one interval (e.g. 1m, 1d)"""
+    symbol = StringField(required=True, max_length=10)
+    interval = StringField(required=True, max_length=4)
+    ts = DateTimeField(required=True)  # bar open time, UTC
+    open = FloatField(required=True)
+    high = FloatField(required=True)
+    low = FloatField(required=True)
+    close = FloatField(required=True)
+    volume = IntField(default=0, min_value=0)
+    # Times of the first and last ticks merged in, so partial bars written
+    # by several workers (or across a restart) combine correctly
+    first_ts = DateTimeField()
+    last_ts = DateTimeField()
+
+    meta = {
+        'collection': 'price_bars',
+        'indexes': [
+            {'fields': ['symbol', 'interval', 'ts'], 'unique': True},
+            ('interval', 'ts')
+        ]
+    }
+
+    def __str__(self):
+        return f"PriceBar(symbol={self.symbol}, interval={self.interval}, ts={self.ts}, close={self.close})"
@@ -19,7 +19,8 @@ class Stock(Document):
         'indexes': [
             'symbol',
             'sector',
-            'created_at'
+            'created_at',
+            'updated_at'
         ]
     }
     
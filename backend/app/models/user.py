@@ -4,12 +4,21 @@ from mongoengine import (
     EmailField,
     DateTimeField,
     BooleanField,
-    ListField
+    IntField,
+    ListField,
+    DictField
 )
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
+DEFAULT_NOTIFICATION_SETTINGS = {
+    'email_notifications': True,
+    'price_alerts': True,
+    'news_updates': False
+}
+
+
 class User(Document):
     """User model for MongoDB using MongoEngine"""
     email = EmailField(required=True, unique=True)
@@ -21,22 +30,23 @@ class User(Document):
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
     last_login = DateTimeField()
+    # Bumped on every save; tokens carry it so cached profiles can be validated
+    profile_version = IntField(default=0)
 
     # User preferences for stock tracking
     watchlist = ListField(StringField(max_length=10))  # List of stock symbols
     preferred_sectors = ListField(StringField(max_length=100))
-    notification_settings = {
-        'email_notifications': BooleanField(default=True),
-        'price_alerts': BooleanField(default=True),
-        'news_updates': BooleanField(default=False)
-    }
+    notification_settings = DictField(default=lambda: dict(DEFAULT_NOTIFICATION_SETTINGS))
+    # Set by the digest job for each user it reached; reruns skip recent ones
+    last_digest_at = DateTimeField()
 
     meta = {
         'collection': 'users',
         'indexes': [
             'email',
             'is_active',
-            'created_at'
+            'created_at',
+            'updated_at'
         ]
     }
 
@@ -68,6 +78,16 @@ class User(Document):
         return f"User(email={self.email}, name={self.name})"
 
     def save(self, *args, **kwargs):
-        """Override save to update updated_at timestamp"""
+        """Override save to update updated_at timestamp and profile version
+
+        The version of an existing user is bumped with an atomic $inc after
+        the write, so concurrent saves from different workers always end on
+        distinct versions.
+        """
         self.updated_at = datetime.utcnow()
-        return super().save(*args, **kwargs)
+        if self.pk is None:
+            self.profile_version = 1
+            return super().save(*args, **kwargs)
+        result = super().save(*args, **kwargs)
+        self.modify(inc__profile_version=1)
+        return result
@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.health import FAILING, liveness, readiness
+
+
+router = APIRouter()
+
+
+def _respond(report: dict) -> JSONResponse:
+    # Degraded still serves traffic; only failing checks take the worker out
+    status_code = 503 if report['status'] == FAILING else 200
+    return JSONResponse(status_code=status_code, content=jsonable_encoder(report))
+
+
+@router.get("")
+async def health():
+    """Overall health; same checks as readiness"""
+    return _respond(readiness())
+
+
+@router.get("/live")
+async def live():
+    """Liveness: fails only when the event loop is stuck"""
+    return _respond(liveness())
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness: cached database probe, pool utilization and event-loop lag"""
+    return _respond(readiness())
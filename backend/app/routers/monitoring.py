@@ -0,0 +1,129 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
+from app.utils.singleflight import singleflight_stats
+from app.middleware.rate_limit import rate_limiter, load_shedder
+from app.utils.loop_monitor import loop_monitor
+from app.services.risk_service import risk_cache
+from app.services.profile_cache import profile_cache
+from app.services.bar_aggregator import bar_aggregator
+from app.services.write_buffer import price_write_buffer
+from app.core.slow_query_log import slow_query_log
+from app.middleware.profiling import request_profiler, is_admin_request
+
+
+router = APIRouter()
+
+
+async def require_admin(request: Request):
+    if not await is_admin_request(request):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+
+@router.get("/quote-refresh")
+async def get_quote_refresh_stats(request: Request):
+    """Get quote refresh scheduler lag, jitter and batch size statistics"""
+    scheduler = getattr(request.app.state, "quote_scheduler", None)
+    if scheduler is None:
+        raise HTTPException(status_code=404, detail="Quote refresh is disabled")
+    return scheduler.stats()
+
+
+@router.get("/singleflight")
+async def get_singleflight_stats():
+    """Get calls, backend executions and calls saved per coalesced lookup"""
+    return singleflight_stats()
+
+
+@router.get("/load")
+async def get_load_stats():
+    """Get rate limiter and load shedder counters"""
+    return {
+        "rate_limiter": rate_limiter.stats(),
+        "load_shedder": load_shedder.stats(),
+    }
+
+
+@router.get("/loop-lag")
+async def get_loop_lag_stats():
+    """Get event-loop lag percentiles and histogram"""
+    return loop_monitor.histogram()
+
+
+@router.get("/risk-cache")
+async def get_risk_cache_stats():
+    """Get watchlist risk cache size and hit counters"""
+    return risk_cache.stats()
+
+
+@router.get("/profile-cache")
+async def get_profile_cache_stats():
+    """Get user profile cache size and hit counters"""
+    return profile_cache.stats()
+
+
+@router.get("/bars")
+async def get_bar_aggregator_stats():
+    """Get tick-to-bar aggregator throughput, late ticks and pending bars"""
+    return bar_aggregator.stats()
+
+
+@router.get("/write-buffer")
+async def get_write_buffer_stats():
+    """Get write-behind price buffer depth and flush counters"""
+    return price_write_buffer.stats()
+
+
+@router.get("/invalidation")
+async def get_invalidation_stats(request: Request):
+    """Get change stream listener mode, event and reconnect counters"""
+    change_streams = getattr(request.app.state, "change_streams", None)
+    if change_streams is None:
+        raise HTTPException(status_code=404, detail="Invalidation bus is disabled")
+    return change_streams.stats()
+
+
+@router.get("/snapshot")
+async def get_snapshot_stats(request: Request):
+    """Get the last screener snapshot restore and write"""
+    snapshots = getattr(request.app.state, "snapshots", None)
+    if snapshots is None:
+        raise HTTPException(status_code=404, detail="Snapshots are disabled")
+    return snapshots.stats()
+
+
+@router.get("/slow-queries")
+async def get_slow_queries():
+    """Get recent queries slower than SLOW_QUERY_THRESHOLD_MS"""
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "total": slow_query_log.slow_queries,
+        "recent": slow_query_log.recent(),
+    }
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """List stored request profiles with their time breakdown"""
+    return request_profiler.list()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str):
+    """Get a stored profile's time breakdown and top functions by cumulative time"""
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(f"{profile['summary']}\n\n{profile['report']}")
+
+
+@router.get("/profiles/{profile_id}/download", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str):
+    """Download a stored profile in pstats format (load with pstats or snakeviz)"""
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=profile['pstats'],
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+    )
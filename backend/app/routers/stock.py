@@ -1,8 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-from app.schemas.stock import StockCreate, StockUpdate, StockResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import List, Optional
+from datetime import datetime
+from app.schemas.stock import (
+    StockCreate,
+    StockUpdate,
+    StockResponse,
+    StockScreenResponse,
+    PriceBarResponse
+)
+from app.services.bar_aggregator import INTERVALS
 from app.services.stock_service import StockService
 from app.dependencies import StockServiceDependency
+from app.utils.encoding import negotiate, encode_columns
 
 router = APIRouter(prefix="", tags=["Stocks"])
 
@@ -22,13 +31,106 @@ async def create_stock(
 
 @router.get("/", response_model=List[StockResponse])
 async def get_stocks(
+    request: Request,
     service: StockServiceDependency,
     skip: int = 0,
     limit: int = 100,
 ):
-    """Get all Stocks with pagination"""
+    """Get all Stocks with pagination
+
+    Honors Accept: application/vnd.apache.arrow.stream and application/msgpack
+    with a columnar encoding of the same fields.
+    """
+    media_type = negotiate(request.headers.get("accept"))
+    if media_type:
+        columns = await service.get_stock_columns(skip=skip, limit=limit)
+        return Response(
+            content=encode_columns(columns, media_type),
+            media_type=media_type,
+            headers={"Vary": "Accept"}
+        )
     return await service.get_stocks(skip=skip, limit=limit)
 
+@router.get("/screen", response_model=StockScreenResponse)
+async def screen_stocks(
+    request: Request,
+    service: StockServiceDependency,
+    sector: Optional[List[str]] = Query(None),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_change_percent: Optional[float] = None,
+    max_change_percent: Optional[float] = None,
+    min_volume: Optional[int] = None,
+    max_volume: Optional[int] = None,
+    min_market_cap: Optional[float] = None,
+    max_market_cap: Optional[float] = None,
+    sort_by: str = "market_cap",
+    descending: bool = True,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Screen Stocks with compound filters, e.g. sector=Technology&min_market_cap=5e10
+
+    Honors the same binary Accept types as GET /stocks/; the page is encoded
+    as columns and the match count is sent in X-Total-Count.
+    """
+    ranges = {
+        "price": (min_price, max_price),
+        "change_percent": (min_change_percent, max_change_percent),
+        "volume": (min_volume, max_volume),
+        "market_cap": (min_market_cap, max_market_cap),
+    }
+    ranges = {field: bounds for field, bounds in ranges.items() if bounds != (None, None)}
+    media_type = negotiate(request.headers.get("accept"))
+    try:
+        if media_type:
+            total, columns = await service.screen_stock_columns(
+                sectors=sector,
+                ranges=ranges,
+                sort_by=sort_by,
+                descending=descending,
+                skip=skip,
+                limit=limit
+            )
+            return Response(
+                content=encode_columns(columns, media_type),
+                media_type=media_type,
+                headers={"Vary": "Accept", "X-Total-Count": str(total)}
+            )
+        return await service.screen_stocks(
+            sectors=sector,
+            ranges=ranges,
+            sort_by=sort_by,
+            descending=descending,
+            skip=skip,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{symbol}/bars", response_model=List[PriceBarResponse])
+async def get_price_bars(
+    symbol: str,
+    request: Request,
+    service: StockServiceDependency,
+    interval: str = "1m",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=100000),
+):
+    """Get OHLCV bars for a symbol; honors the same binary Accept types as GET /stocks/"""
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {', '.join(INTERVALS)}")
+    columns = await service.get_price_bar_columns(symbol, interval, start=start, end=end, limit=limit)
+    media_type = negotiate(request.headers.get("accept"))
+    if media_type:
+        return Response(
+            content=encode_columns(columns, media_type),
+            media_type=media_type,
+            headers={"Vary": "Accept"}
+        )
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
 @router.get("/{id}", response_model=StockResponse)
 async def get_stock(
     id: int,
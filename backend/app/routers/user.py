@@ -2,7 +2,8 @@ from fastapi import (
     APIRouter,
     HTTPException,
     status,
-    Request
+    Request,
+    Query
 )
 import jwt
 from datetime import datetime, timezone, timedelta
@@ -16,12 +17,18 @@ from app.schemas.user import (
     UserPreferencesUpdate,
     Token
 )
+from app.schemas.portfolio import LotCreate, PortfolioResponse
+from app.schemas.risk import WatchlistRiskResponse
 from app.services.user_service import UserService
+from app.services.portfolio_service import PortfolioService
+from app.services.risk_service import RiskService
 from app.dependencies import SettingsDependency
 
 
 router = APIRouter()
 user_service = UserService()
+portfolio_service = PortfolioService()
+risk_service = RiskService()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -54,10 +61,7 @@ async def login_user(
     # datetime.now(timezone.utc) + timedelta(seconds=settings.JWT_EXPIRATION_TIME)
     payload = {
         "user_id": user.id,
-        "email": user.email,
-        "name": user.name,
-        "watchlist": user.watchlist,
-        "preferred_sectors": user.preferred_sectors,
+        "ver": user.profile_version,
         "exp": expiration_time
     }
     print(payload)
@@ -80,36 +84,60 @@ async def get_user_profile(
     settings: SettingsDependency
 ):
     """Get user profile"""
+    user = request.state.user
+    db_user = await user_service.get_profile(user['id'], user['version'])
+    if not db_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return db_user
+
+
+@router.get("/me/watchlist/risk", response_model=WatchlistRiskResponse)
+async def get_watchlist_risk(
+    request: Request,
+    window: int = Query(252, ge=2, le=2520, description="Number of daily returns"),
+    confidence: float = Query(0.95, gt=0.5, lt=1.0)
+):
+    """Get correlation, covariance, volatility and VaR for current user's watchlist"""
+    user = await user_service.get_profile(request.state.user['id'], request.state.user['version'])
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return await risk_service.get_watchlist_risk(user.watchlist, window=window, confidence=confidence)
+
+
+@router.get("/me/portfolio", response_model=PortfolioResponse)
+async def get_portfolio(request: Request):
+    """Get current user's portfolio with market value, P&L and sector exposure"""
+    return await portfolio_service.get_portfolio(request.state.user['id'])
+
+
+@router.post("/me/portfolio/lots", response_model=PortfolioResponse, status_code=status.HTTP_201_CREATED)
+async def add_portfolio_lot(request: Request, lot_data: LotCreate):
+    """Record a purchase lot in current user's portfolio"""
     try:
-        user = request.state.user
-        
-        print('user', user)
-        db_user = await user_service.get_user(user['id'])
-        if not db_user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        user_response = UserResponse(
-            id=user['id'],
-            email=user['email'],
-            name=user['name'],
-            watchlist=db_user.watchlist,
-            preferred_sectors=db_user.preferred_sectors,
-            is_active=db_user.is_active,
-            is_verified=db_user.is_verified,
-            is_admin=db_user.is_admin,
-            created_at=db_user.created_at,
-            updated_at=db_user.updated_at,
-            last_login=db_user.last_login,
+        return await portfolio_service.add_lot(request.state.user['id'], lot_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        return user_response
-    except Exception as e:
-        print('error', e)
+
+
+@router.delete("/me/portfolio/{stock_symbol}", response_model=PortfolioResponse)
+async def remove_portfolio_holding(request: Request, stock_symbol: str):
+    """Remove a holding from current user's portfolio"""
+    portfolio = await portfolio_service.remove_holding(request.state.user['id'], stock_symbol)
+    if not portfolio:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Unauthorized"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Holding not found"
         )
+    return portfolio
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -202,9 +230,11 @@ async def update_preferences(user_id: str, preferences_data: UserPreferencesUpda
 
 
 @router.get("/{user_id}/watchlist", response_model=List[str])
-async def get_watchlist(user_id: str):
+async def get_watchlist(user_id: str, request: Request):
     """Get user's watchlist"""
-    user = await user_service.get_user(user_id)
+    token_user = request.state.user
+    min_version = token_user['version'] if token_user['id'] == user_id else 0
+    user = await user_service.get_profile(user_id, min_version)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,46 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class LotCreate(BaseModel):
+    """Schema for recording a purchase"""
+    symbol: str = Field(..., max_length=10)
+    quantity: float = Field(..., gt=0)
+    price: float = Field(..., ge=0)
+    """Price paid per share"""
+    acquired_at: Optional[datetime] = None
+
+
+class HoldingValuation(BaseModel):
+    """Schema for a valued holding"""
+    symbol: str
+    quantity: float
+    cost_basis: float
+    price: Optional[float]
+    """Current price, or None when no quote is available"""
+    market_value: float
+    unrealized_pnl: float
+    unrealized_pnl_percent: Optional[float]
+    weight: float
+    """Share of total portfolio market value"""
+    sector: Optional[str]
+
+
+class SectorExposure(BaseModel):
+    """Schema for portfolio exposure to one sector"""
+    sector: str
+    market_value: float
+    weight: float
+
+
+class PortfolioResponse(BaseModel):
+    """Schema for a valued portfolio"""
+    user_id: str
+    market_value: float
+    cost_basis: float
+    unrealized_pnl: float
+    unrealized_pnl_percent: Optional[float]
+    holdings: List[HoldingValuation]
+    sector_exposure: List[SectorExposure]
+    valued_at: datetime
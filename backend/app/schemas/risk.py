@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Dict, List
+from datetime import datetime
+
+
+class WatchlistRiskResponse(BaseModel):
+    """Schema for watchlist risk metrics"""
+    symbols: List[str]
+    """Symbols in matrix order"""
+    missing_symbols: List[str]
+    """Watchlist symbols without enough daily history"""
+    window: int
+    """Number of daily returns used"""
+    confidence: float
+    correlation: List[List[float]]
+    covariance: List[List[float]]
+    """Daily return covariance"""
+    volatility: Dict[str, float]
+    """Annualized volatility per symbol"""
+    value_at_risk: Dict[str, float]
+    """One-day historical VaR per symbol, as a positive return loss"""
+    portfolio_value_at_risk: float
+    """One-day historical VaR of an equal-weighted watchlist portfolio"""
+    computed_at: datetime
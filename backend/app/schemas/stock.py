@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -45,3 +45,33 @@ class StockResponse(StockBase):
     
     class Config:
         from_attributes = True
+
+
+class StockScreenResult(BaseModel):
+    """Schema for a single row of a stock screen"""
+    symbol: str
+    name: Optional[str]
+    price: Optional[float]
+    change_percent: Optional[float]
+    volume: Optional[int]
+    market_cap: Optional[float]
+    sector: Optional[str]
+
+
+class StockScreenResponse(BaseModel):
+    """Schema for stock screen results"""
+    total: int
+    """Number of stocks matching the filters"""
+    results: List[StockScreenResult]
+    """Requested page of matching stocks"""
+
+
+class PriceBarResponse(BaseModel):
+    """Schema for an OHLCV price bar"""
+    ts: datetime
+    """Bar open time (UTC)"""
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
@@ -37,6 +37,7 @@ class UserResponse(UserBase):
     last_login: Optional[datetime] = None
     watchlist: List[str]
     preferred_sectors: List[str]
+    profile_version: int = 0
     
     class Config:
         from_attributes = True
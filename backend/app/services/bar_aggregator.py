@@ -0,0 +1,280 @@
+import asyncio
+import math
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.models.price_bar import PriceBar
+from app.services.risk_service import risk_cache
+
+
+# Finest interval first; each level is rolled up from the one before it
+LEVELS: Tuple[Tuple[str, int], ...] = (('1m', 60), ('5m', 300), ('1h', 3600), ('1d', 86400))
+INTERVALS = tuple(name for name, _ in LEVELS)
+
+# Bar layout: [open, high, low, close, volume, first_ts, last_ts]
+OPEN, HIGH, LOW, CLOSE, VOLUME, FIRST_TS, LAST_TS = range(7)
+
+
+class _SymbolState:
+    __slots__ = ('watermark', 'next_seal_at', 'last_volume', 'session', 'open_bars')
+
+    def __init__(self):
+        self.watermark = -math.inf
+        self.next_seal_at = math.inf
+        self.last_volume: Optional[int] = None
+        self.session: Optional[int] = None  # UTC day of last_volume
+        self.open_bars: List[Dict[float, list]] = [{} for _ in LEVELS]
+
+
+class BarAggregator:
+    """Streaming tick-to-OHLCV resampler with cascading rollups
+
+    Ticks update open 1m bars. A bar closes once the symbol's watermark
+    (latest tick time) passes its end plus the grace window; the closed bar
+    is queued for storage and merged into the enclosing 5m bar, and so on up
+    to 1d, so coarser bars never touch raw ticks. Ticks for a bar that has
+    already closed are counted and dropped. Open bars per symbol are bounded
+    by the grace window, so memory per symbol is constant.
+
+    Tick volume is the cumulative session volume carried on Stock.volume;
+    bars receive the increase since the previous in-order tick. Sessions
+    are UTC days. Late ticks still update prices but add no volume, since
+    the ticks after them have already counted it.
+
+    Bars are written as merges into any stored bar for the same slot, so
+    several workers, or one worker across a restart, can each contribute
+    part of a bar. Open bars are closed and written on stop.
+    """
+
+    def __init__(
+        self,
+        grace_seconds: float = None,
+        flush_interval: float = None,
+        max_pending: int = None,
+        use_wall_clock: bool = True
+    ):
+        self.grace = settings.BAR_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        self.flush_interval = flush_interval or settings.BAR_FLUSH_INTERVAL
+        self.max_pending = max_pending or settings.BAR_MAX_PENDING
+        self.use_wall_clock = use_wall_clock
+        self.ticks = 0
+        self.late_ticks = 0
+        self.flushed = 0
+        self.dropped = 0
+        self._symbols: Dict[str, _SymbolState] = {}
+        self._closed: List[tuple] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_tick(self, symbol: str, price: float, volume: Optional[int] = None, ts: Optional[float] = None):
+        """Consume one price/volume update; `ts` is epoch seconds (defaults to now)"""
+        if ts is None:
+            ts = time.time()
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = _SymbolState()
+        self.ticks += 1
+
+        traded = 0
+        if volume is not None and ts >= state.watermark:
+            session = int(ts // 86400)
+            if state.last_volume is not None:
+                if session != state.session:
+                    traded = volume
+                else:
+                    # Cumulative volume only shrinks on feed corrections
+                    traded = max(volume - state.last_volume, 0)
+            state.last_volume = volume
+            state.session = session
+
+        if ts > state.watermark:
+            state.watermark = ts
+            if ts >= state.next_seal_at:
+                self._seal(symbol, state)
+
+        start = ts - ts % 60
+        if start + 60 + self.grace <= state.watermark:
+            self.late_ticks += 1
+            return
+
+        bars = state.open_bars[0]
+        bar = bars.get(start)
+        if bar is None:
+            bars[start] = [price, price, price, price, traded, ts, ts]
+            seal_at = start + 60 + self.grace
+            if seal_at < state.next_seal_at:
+                state.next_seal_at = seal_at
+            return
+        if price > bar[HIGH]:
+            bar[HIGH] = price
+        elif price < bar[LOW]:
+            bar[LOW] = price
+        if ts < bar[FIRST_TS]:
+            bar[OPEN] = price
+            bar[FIRST_TS] = ts
+        if ts >= bar[LAST_TS]:
+            bar[CLOSE] = price
+            bar[LAST_TS] = ts
+        bar[VOLUME] += traded
+
+    def _seal(self, symbol: str, state: _SymbolState):
+        """Close every bar whose end plus grace is behind the watermark, cascading upward"""
+        watermark = state.watermark
+        next_seal_at = math.inf
+        for level, (name, seconds) in enumerate(LEVELS):
+            bars = state.open_bars[level]
+            for start in [s for s in bars if s + seconds + self.grace <= watermark]:
+                bar = bars.pop(start)
+                self._closed.append((symbol, name, start, bar))
+                if level + 1 < len(LEVELS):
+                    self._merge(state, level + 1, bar)
+            for start in bars:
+                next_seal_at = min(next_seal_at, start + seconds + self.grace)
+        state.next_seal_at = next_seal_at
+        if len(self._closed) > self.max_pending:
+            overflow = len(self._closed) - self.max_pending
+            self.dropped += overflow
+            del self._closed[:overflow]
+
+    def _merge(self, state: _SymbolState, level: int, bar: list):
+        seconds = LEVELS[level][1]
+        start = bar[FIRST_TS] - bar[FIRST_TS] % seconds
+        parent = state.open_bars[level].get(start)
+        if parent is None:
+            state.open_bars[level][start] = list(bar)
+            return
+        parent[HIGH] = max(parent[HIGH], bar[HIGH])
+        parent[LOW] = min(parent[LOW], bar[LOW])
+        if bar[FIRST_TS] < parent[FIRST_TS]:
+            parent[OPEN] = bar[OPEN]
+            parent[FIRST_TS] = bar[FIRST_TS]
+        if bar[LAST_TS] >= parent[LAST_TS]:
+            parent[CLOSE] = bar[CLOSE]
+            parent[LAST_TS] = bar[LAST_TS]
+        parent[VOLUME] += bar[VOLUME]
+
+    def advance(self, now: float):
+        """Move every symbol's watermark to `now` so idle symbols still close bars"""
+        for symbol, state in self._symbols.items():
+            if now > state.watermark:
+                state.watermark = now
+                if now >= state.next_seal_at:
+                    self._seal(symbol, state)
+
+    def drain(self) -> List[tuple]:
+        """Take all closed bars queued for storage"""
+        if self.use_wall_clock:
+            self.advance(time.time())
+        closed, self._closed = self._closed, []
+        return closed
+
+    @staticmethod
+    def _unwritten(closed: List[tuple], error: Exception) -> List[tuple]:
+        """Bars a failed write did not store; an unordered bulk write applies the rest"""
+        if isinstance(error, BulkWriteError):
+            return [closed[item['index']] for item in error.details.get('writeErrors', [])]
+        return closed
+
+    def _requeue(self, closed: List[tuple]):
+        # Retried on the next flush; _seal bounds the backlog
+        self._closed[:0] = closed
+
+    @staticmethod
+    def _merge_update(bar: list) -> list:
+        """Update pipeline merging a (possibly partial) bar into the stored one"""
+        first_ts = datetime.utcfromtimestamp(bar[FIRST_TS])
+        last_ts = datetime.utcfromtimestamp(bar[LAST_TS])
+        # Every expression reads the stored bar as it was before this update
+        return [{'$set': {
+            'open': {'$cond': [{'$lte': [first_ts, {'$ifNull': ['$first_ts', first_ts]}]}, bar[OPEN], '$open']},
+            'close': {'$cond': [{'$gte': [last_ts, {'$ifNull': ['$last_ts', last_ts]}]}, bar[CLOSE], '$close']},
+            'high': {'$max': ['$high', bar[HIGH]]},
+            'low': {'$min': ['$low', bar[LOW]]},
+            'volume': {'$add': [{'$ifNull': ['$volume', 0]}, int(bar[VOLUME])]},
+            'first_ts': {'$min': ['$first_ts', first_ts]},
+            'last_ts': {'$max': ['$last_ts', last_ts]},
+        }}]
+
+    def write(self, closed: List[tuple]) -> int:
+        """Merge closed bars into storage with one unordered bulk upsert
+
+        Volume is added, so a bar must be written once: after a partial
+        bulk failure only the failed bars are retried.
+        """
+        if not closed:
+            return 0
+        requests = [
+            UpdateOne(
+                {'symbol': symbol, 'interval': interval, 'ts': datetime.utcfromtimestamp(start)},
+                self._merge_update(bar),
+                upsert=True
+            )
+            for symbol, interval, start, bar in closed
+        ]
+        PriceBar._get_collection().bulk_write(requests, ordered=False)
+        self.flushed += len(requests)
+        risk_cache.invalidate_symbols({symbol for symbol, interval, _, _ in closed if interval == '1d'})
+        return len(requests)
+
+    def flush(self) -> int:
+        """Write all closed bars synchronously"""
+        closed = self.drain()
+        try:
+            return self.write(closed)
+        except Exception as e:
+            self._requeue(self._unwritten(closed, e))
+            raise
+
+    async def flush_async(self) -> int:
+        """Write all closed bars without blocking the event loop
+
+        Aggregator state is only touched on the loop; the thread does I/O only.
+        """
+        closed = self.drain()
+        try:
+            return await asyncio.to_thread(self.write, closed)
+        except Exception as e:
+            self._requeue(self._unwritten(closed, e))
+            raise
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Write open bars too; a later run merges the rest of them in
+        self.advance(math.inf)
+        await self.flush_async()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_async()
+            except Exception as e:
+                print(f"Bar flush failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'symbols': len(self._symbols),
+            'open_bars': sum(len(bars) for state in self._symbols.values() for bars in state.open_bars),
+            'pending': len(self._closed),
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+        }
+
+
+bar_aggregator = BarAggregator()
@@ -0,0 +1,340 @@
+import asyncio
+import os
+import smtplib
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.models.stock import Stock
+from app.models.user import DEFAULT_NOTIFICATION_SETTINGS, User
+
+
+class Digest(NamedTuple):
+    """One rendered digest ready to send"""
+    to: str
+    subject: str
+    body: str
+    user_id: Optional[ObjectId] = None
+
+
+class DigestSender(ABC):
+    """Pluggable delivery of rendered digests"""
+
+    @abstractmethod
+    async def send(self, digest: Digest):
+        """Deliver one digest; raise on failure"""
+
+    def is_transient(self, error: Exception) -> bool:
+        """Whether a failed send is worth retrying"""
+        return isinstance(error, OSError)
+
+    async def close(self):
+        pass
+
+
+def _message(digest: Digest) -> EmailMessage:
+    message = EmailMessage()
+    message['From'] = settings.DIGEST_FROM
+    message['To'] = digest.to
+    message['Subject'] = digest.subject
+    message.set_content(digest.body)
+    return message
+
+
+class FileDigestSender(DigestSender):
+    """Write each digest as an .eml file, a local stand-in for SMTP
+
+    Each sender writes into its own run directory, so a rerun never
+    overwrites an earlier run's files.
+    """
+
+    def __init__(self, directory: str = None):
+        run_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.directory = os.path.join(directory or settings.DIGEST_OUTBOX_DIR, run_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self._sequence = 0
+
+    def _write(self, sequence: int, digest: Digest):
+        # Shard so no directory grows past 10k files
+        directory = os.path.join(self.directory, f"{sequence // 10000:05d}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{sequence:09d}.eml"), 'xb') as f:
+            f.write(_message(digest).as_bytes())
+
+    async def send(self, digest: Digest):
+        self._sequence += 1
+        await asyncio.to_thread(self._write, self._sequence, digest)
+
+
+class SmtpDigestSender(DigestSender):
+    """Send digests over SMTP, reusing one connection per worker thread
+
+    Sends run on a dedicated pool sized to the send concurrency, so there
+    is one connection per concurrent send and the default executor stays
+    free for the rest of the job.
+    """
+
+    def __init__(self, concurrency: int = None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency or settings.DIGEST_CONCURRENCY, thread_name_prefix='digest-smtp'
+        )
+        self._local = threading.local()
+        self._connections: List[smtplib.SMTP] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> smtplib.SMTP:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+            if settings.SMTP_USE_TLS:
+                connection.starttls()
+            if settings.SMTP_USERNAME:
+                connection.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _send(self, digest: Digest):
+        try:
+            self._connection().send_message(_message(digest))
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # Reconnect on the next attempt
+            self._local.connection = None
+            raise
+
+    async def send(self, digest: Digest):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._send, digest)
+
+    def is_transient(self, error: Exception) -> bool:
+        # 4xx replies are temporary by definition; 5xx are permanent
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return all(400 <= code < 500 for code, _ in error.recipients.values())
+        if isinstance(error, smtplib.SMTPConnectError):
+            return True
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        if isinstance(error, smtplib.SMTPException):
+            return False
+        return isinstance(error, OSError)
+
+    def _quit(self):
+        for connection in self._connections:
+            try:
+                connection.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._connections = []
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._quit)
+        self._executor.shutdown(wait=False)
+
+
+DIGEST_SENDERS = {
+    'file': FileDigestSender,
+    'smtp': SmtpDigestSender,
+}
+
+
+def get_digest_sender(name: str = None, concurrency: int = None) -> DigestSender:
+    """Instantiate the configured digest sender"""
+    name = name or settings.DIGEST_SENDER
+    try:
+        sender_class = DIGEST_SENDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown digest sender '{name}'")
+    if sender_class is SmtpDigestSender:
+        return SmtpDigestSender(concurrency)
+    return sender_class()
+
+
+class DigestService:
+    """Nightly watchlist digests, computed per unique watchlist
+
+    Stocks are read once into memory. Users are streamed in batches; the
+    summary for each distinct watchlist symbol set is rendered once and
+    shared by every user with that set, so per-user work is a greeting
+    plus string concatenation.
+
+    Each batch stamps `last_digest_at` on the users it reached, and users
+    stamped within `min_interval_hours` are skipped, so a rerun after a
+    crash resumes instead of emailing everyone again. At most the batch
+    in progress at the crash is sent twice.
+    """
+
+    def __init__(
+        self,
+        sender: Optional[DigestSender] = None,
+        batch_size: int = None,
+        concurrency: int = None,
+        max_retries: int = None,
+        alert_threshold: float = None,
+        min_interval_hours: float = None
+    ):
+        self.batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+        self.concurrency = concurrency or settings.DIGEST_CONCURRENCY
+        self.sender = sender or get_digest_sender(concurrency=self.concurrency)
+        self.min_interval_hours = (
+            settings.DIGEST_MIN_INTERVAL_HOURS if min_interval_hours is None else min_interval_hours
+        )
+        self.max_retries = settings.DIGEST_MAX_RETRIES if max_retries is None else max_retries
+        self.alert_threshold = settings.DIGEST_ALERT_THRESHOLD if alert_threshold is None else alert_threshold
+        # (symbols, price_alerts) -> rendered summary, bounded for very diverse watchlists
+        self._summaries: "OrderedDict[Tuple[Tuple[str, ...], bool], str]" = OrderedDict()
+        self._quotes: Dict[str, Tuple[str, Optional[float], Optional[float]]] = {}
+        self.stats = {
+            'users': 0, 'skipped': 0, 'summaries_computed': 0,
+            'sent': 0, 'failed': 0, 'retries': 0,
+        }
+
+    def load_quotes(self):
+        """Read every stock once: symbol -> (name, price, change_percent)"""
+        cursor = Stock._get_collection().find(
+            {}, {'_id': 0, 'symbol': 1, 'name': 1, 'price': 1, 'change_percent': 1}
+        )
+        self._quotes = {
+            doc['symbol']: (doc.get('name') or doc['symbol'], doc.get('price'), doc.get('change_percent'))
+            for doc in cursor
+        }
+
+    def summary(self, symbols: Tuple[str, ...], price_alerts: bool) -> str:
+        """Rendered price-change summary for one watchlist, computed once per set"""
+        key = (symbols, price_alerts)
+        cached = self._summaries.get(key)
+        if cached is not None:
+            self._summaries.move_to_end(key)
+            return cached
+
+        rows = []
+        for symbol in symbols:
+            name, price, change = self._quotes.get(symbol, (symbol, None, None))
+            rows.append((symbol, name, price, change))
+        # Biggest movers first; symbols without a quote last
+        rows.sort(key=lambda row: -abs(row[3]) if row[3] is not None else float('inf'))
+
+        lines = []
+        changes = [row[3] for row in rows if row[3] is not None]
+        if changes:
+            lines.append(f"Your watchlist moved {sum(changes) / len(changes):+.2f}% on average today.")
+            lines.append("")
+        for symbol, name, price, change in rows:
+            if price is None:
+                lines.append(f"  {symbol:<8} {name[:32]:<32} no quote")
+            else:
+                change_text = f"{change:+.2f}%" if change is not None else "n/a"
+                lines.append(f"  {symbol:<8} {name[:32]:<32} {price:>10.2f} {change_text:>9}")
+        if price_alerts:
+            alerts = [row for row in rows if row[3] is not None and abs(row[3]) >= self.alert_threshold]
+            if alerts:
+                lines.append("")
+                lines.append(f"Price alerts (moves of {self.alert_threshold:g}% or more):")
+                lines.extend(f"  {symbol} {change:+.2f}%" for symbol, _, _, change in alerts)
+        rendered = "\n".join(lines)
+
+        self._summaries[key] = rendered
+        self.stats['summaries_computed'] += 1
+        if len(self._summaries) > settings.DIGEST_SUMMARY_CACHE_SIZE:
+            self._summaries.popitem(last=False)
+        return rendered
+
+    def render_batch(self, users: List[dict]) -> List[Digest]:
+        """Render a batch of users, grouping them by watchlist symbol set"""
+        groups: Dict[Tuple[Tuple[str, ...], bool], List[dict]] = {}
+        for user in users:
+            notifications = {**DEFAULT_NOTIFICATION_SETTINGS, **(user.get('notification_settings') or {})}
+            symbols = tuple(sorted(set(user.get('watchlist') or ())))
+            if not notifications['email_notifications'] or not symbols:
+                self.stats['skipped'] += 1
+                continue
+            groups.setdefault((symbols, notifications['price_alerts']), []).append(user)
+
+        digests = []
+        for (symbols, price_alerts), members in groups.items():
+            summary = self.summary(symbols, price_alerts)
+            subject = f"Your watchlist digest: {len(symbols)} stock{'s' if len(symbols) != 1 else ''}"
+            for user in members:
+                greeting = f"Hi {user.get('name') or 'there'},"
+                digests.append(Digest(user['email'], subject, f"{greeting}\n\n{summary}\n", user.get('_id')))
+        return digests
+
+    async def _send(self, digest: Digest, semaphore: asyncio.Semaphore) -> bool:
+        """Send one digest, retrying transient failures; returns whether it was sent"""
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                try:
+                    await self.sender.send(digest)
+                    self.stats['sent'] += 1
+                    return True
+                except Exception as e:
+                    error = e
+            if attempt == self.max_retries or not self.sender.is_transient(error):
+                self.stats['failed'] += 1
+                print(f"Digest to {digest.to} failed after {attempt + 1} attempts: {error}")
+                return False
+            self.stats['retries'] += 1
+            # Back off without holding a send slot
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    def _user_batches(self, since: datetime):
+        cursor = User._get_collection().find(
+            {'is_active': True, 'watchlist.0': {'$exists': True}, 'last_digest_at': {'$not': {'$gte': since}}},
+            {'email': 1, 'name': 1, 'watchlist': 1, 'notification_settings': 1}
+        ).batch_size(self.batch_size)
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _mark_sent(user_ids: List[ObjectId], sent_at: datetime):
+        if user_ids:
+            User._get_collection().update_many(
+                {'_id': {'$in': user_ids}}, {'$set': {'last_digest_at': sent_at}}
+            )
+
+    async def run(self) -> dict:
+        """Send digests to every active user with a watchlist not digested recently"""
+        started = time.perf_counter()
+        started_at = datetime.utcnow()
+        await asyncio.to_thread(self.load_quotes)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        batches = self._user_batches(started_at - timedelta(hours=self.min_interval_hours))
+        try:
+            users = await asyncio.to_thread(next, batches, None)
+            while users is not None:
+                # Read the next batch while this one is being sent
+                next_users = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+                self.stats['users'] += len(users)
+                digests = self.render_batch(users)
+                sent = await asyncio.gather(*(self._send(digest, semaphore) for digest in digests))
+                await asyncio.to_thread(
+                    self._mark_sent,
+                    [digest.user_id for digest, ok in zip(digests, sent) if ok and digest.user_id is not None],
+                    started_at
+                )
+                users = await next_users
+        finally:
+            await self.sender.close()
+        elapsed = time.perf_counter() - started
+        return {
+            **self.stats,
+            'stocks': len(self._quotes),
+            'elapsed_seconds': elapsed,
+            'users_per_second': self.stats['users'] / elapsed if elapsed else 0.0,
+        }
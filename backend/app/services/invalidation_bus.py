@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from mongoengine.connection import get_db
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.config import settings
+
+
+# Server error code when $changeStream is used outside a replica set
+CHANGE_STREAM_UNSUPPORTED = 40573
+# Resume token fell off the oplog; changes were missed
+CHANGE_STREAM_HISTORY_LOST = 286
+
+
+class InvalidationEvent(NamedTuple):
+    """Compact description of one change to a watched collection"""
+    collection: str
+    operation: str  # insert, update, replace, delete, or reset when changes may have been missed
+    document_id: Any
+    document: Optional[dict]  # full post-image, None for deletes
+
+
+class InvalidationBus:
+    """In-process fan-out of collection changes to local caches and indexes
+
+    Listeners run in background threads; events are handed to the event
+    loop so subscribers never race with request handlers.
+    """
+
+    def __init__(self):
+        self.published = 0
+        self._subscribers: Dict[str, List[Callable[[InvalidationEvent], None]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self, collection: str, callback: Callable[[InvalidationEvent], None]):
+        self._subscribers.setdefault(collection, []).append(callback)
+
+    def publish(self, event: InvalidationEvent):
+        """Deliver an event to subscribers on the bound loop (or inline if unbound)"""
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._dispatch, event)
+        else:
+            self._dispatch(event)
+
+    def _dispatch(self, event: InvalidationEvent):
+        self.published += 1
+        for callback in self._subscribers.get(event.collection, ()):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Invalidation subscriber failed for {event.collection}: {e}")
+
+
+invalidation_bus = InvalidationBus()
+
+
+class ChangeStreamListener:
+    """Watch one collection and publish its changes to the invalidation bus
+
+    Uses a MongoDB change stream and resumes from the last resume token
+    after disconnects. When change streams are unavailable (standalone
+    server) it falls back to polling `updated_at`; polling cannot observe
+    deletes.
+    """
+
+    def __init__(self, collection: str, bus: InvalidationBus = invalidation_bus):
+        self.collection = collection
+        self.bus = bus
+        self.mode = 'stopped'
+        self.events = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+        self._resume_token = None
+        self._stop = threading.Event()
+        # Set once changes are being observed, by stream or by polling
+        self.ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=f"change-stream-{self.collection}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.ready.clear()
+        self.mode = 'stopped'
+
+    def _run(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                self._watch()
+                backoff = 0.5
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    print(f"Change streams unavailable for {self.collection}, polling updated_at")
+                    self._poll()
+                    return
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    # Start a fresh stream and tell subscribers to rebuild
+                    self._resume_token = None
+                    self.bus.publish(InvalidationEvent(self.collection, 'reset', None, None))
+                self._record_failure(e)
+            except PyMongoError as e:
+                self._record_failure(e)
+            # Reconnect with capped exponential backoff, keeping the resume token
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, settings.CHANGE_STREAM_MAX_BACKOFF)
+
+    def _record_failure(self, error: Exception):
+        self.reconnects += 1
+        self.last_error = str(error)
+        print(f"Change stream for {self.collection} interrupted: {error}")
+
+    def _watch(self):
+        collection = get_db()[self.collection]
+        with collection.watch(
+            full_document='updateLookup',
+            resume_after=self._resume_token,
+            max_await_time_ms=1000
+        ) as stream:
+            self.mode = 'change_stream'
+            self.ready.set()
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    continue
+                self._resume_token = stream.resume_token
+                operation = change['operationType']
+                if operation not in ('insert', 'update', 'replace', 'delete'):
+                    continue
+                self.events += 1
+                self.bus.publish(InvalidationEvent(
+                    collection=self.collection,
+                    operation=operation,
+                    document_id=change['documentKey']['_id'],
+                    document=change.get('fullDocument')
+                ))
+
+    def _poll(self):
+        self.mode = 'polling'
+        collection = get_db()[self.collection]
+        high_water_mark = datetime.utcnow()
+        seen_at_mark = set()
+        self.ready.set()
+        while not self._stop.wait(settings.CHANGE_STREAM_POLL_INTERVAL):
+            try:
+                # $gte plus the ids already seen at the mark avoids missing same-instant writes
+                docs = list(collection.find({'updated_at': {'$gte': high_water_mark}}).sort('updated_at', 1))
+            except PyMongoError as e:
+                self._record_failure(e)
+                continue
+            for doc in docs:
+                if doc['updated_at'] == high_water_mark and doc['_id'] in seen_at_mark:
+                    continue
+                if doc['updated_at'] > high_water_mark:
+                    high_water_mark = doc['updated_at']
+                    seen_at_mark = set()
+                seen_at_mark.add(doc['_id'])
+                self.events += 1
+                self.bus.publish(InvalidationEvent(
+                    collection=self.collection,
+                    operation='update',
+                    document_id=doc['_id'],
+                    document=doc
+                ))
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.mode,
+            'events': self.events,
+            'reconnects': self.reconnects,
+            'last_error': self.last_error,
+        }
+
+
+class ChangeStreamManager:
+    """Owns one listener per watched collection for the lifespan"""
+
+    def __init__(self, collections: List[str], bus: InvalidationBus = invalidation_bus):
+        self.bus = bus
+        self.listeners = [ChangeStreamListener(collection, bus) for collection in collections]
+
+    def start(self):
+        self.bus.bind(asyncio.get_running_loop())
+        for listener in self.listeners:
+            listener.start()
+
+    async def wait_ready(self, timeout: float = 10.0) -> bool:
+        """Wait until every listener observes changes; False on timeout"""
+        deadline = time.monotonic() + timeout
+        return await asyncio.to_thread(lambda: all(
+            listener.ready.wait(max(0.0, deadline - time.monotonic())) for listener in self.listeners
+        ))
+
+    async def stop(self):
+        await asyncio.to_thread(lambda: [listener.stop() for listener in self.listeners])
+
+    def stats(self) -> dict:
+        return {
+            'published': self.bus.published,
+            'listeners': {listener.collection: listener.stats() for listener in self.listeners},
+        }
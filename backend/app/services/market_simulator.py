@@ -0,0 +1,185 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+SECTORS = [
+    "Technology", "Healthcare", "Financials", "Consumer Discretionary", "Consumer Staples",
+    "Energy", "Industrials", "Materials", "Utilities", "Real Estate", "Communication Services",
+]
+# Sectors for the predefined companies, which lead the simulated universe
+SEED_SECTORS = {
+    "AAPL": "Technology", "MSFT": "Technology", "GOOGL": "Communication Services",
+    "AMZN": "Consumer Discretionary", "TSLA": "Consumer Discretionary",
+    "META": "Communication Services", "NVDA": "Technology", "JPM": "Financials",
+    "V": "Financials", "WMT": "Consumer Staples",
+}
+TRADING_SECONDS_PER_YEAR = 252 * 6.5 * 3600
+
+
+class MarketSimulator:
+    """Synthetic market with correlated geometric Brownian motion prices
+
+    Returns follow a one-market, one-sector factor model, so correlation
+    costs O(instruments) per step instead of a dense Cholesky factor.
+    Volume scales with market cap and rises with the size of each move.
+    All paths are generated as whole arrays; `simulate` produces
+    `steps * instruments` ticks per call.
+    """
+
+    def __init__(
+        self,
+        instruments: int = 500,
+        seed: Optional[int] = None,
+        step_seconds: float = 1.0,
+        seed_companies: Optional[List[dict]] = None,
+        market_correlation: float = 0.3,
+        sector_correlation: float = 0.2
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.step_seconds = step_seconds
+        self.dt = step_seconds / TRADING_SECONDS_PER_YEAR
+        self.steps = 0
+        self._clock = time.monotonic()
+        self._session_day = int(time.time() // 86400)
+
+        companies = list(seed_companies or [])[:instruments]
+        synthetic = instruments - len(companies)
+        self.symbols: List[str] = [company['symbol'] for company in companies] + [
+            f"SIM{i:05d}" for i in range(synthetic)
+        ]
+        self.names: List[str] = [company['name'] for company in companies] + [
+            f"Simulated Company {i}" for i in range(synthetic)
+        ]
+        self.index: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        sector_codes = self.rng.integers(0, len(SECTORS), instruments)
+        for i, company in enumerate(companies):
+            sector = SEED_SECTORS.get(company['symbol'])
+            if sector:
+                sector_codes[i] = SECTORS.index(sector)
+        self.sector_codes = sector_codes
+        self.sectors = [SECTORS[code] for code in sector_codes]
+
+        # Market caps are heavy tailed; larger companies are less volatile
+        self.market_caps = np.exp(self.rng.normal(np.log(10e9), 1.5, instruments)).clip(5e7, 4e12)
+        size = np.log(self.market_caps / 1e9)
+        self.volatility = (0.45 - 0.04 * size + self.rng.normal(0, 0.05, instruments)).clip(0.1, 1.2)
+        self.drift = self.rng.normal(0.07, 0.05, instruments)
+        self.prices = np.exp(self.rng.normal(np.log(60), 1.0, instruments)).clip(1, 3000)
+        self.previous_close = self.prices.copy()
+        self.base_volume = (self.market_caps / self.prices * 0.004).clip(1e4, None)
+        self.volumes = np.zeros(instruments, dtype=np.int64)
+
+        # Factor loadings giving pairwise correlation market + sector (same sector)
+        self.market_loading = np.sqrt(market_correlation)
+        self.sector_loading = np.sqrt(sector_correlation)
+        self.idiosyncratic_loading = np.sqrt(1 - market_correlation - sector_correlation)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def simulate(self, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Advance `steps` steps; returns (prices, volumes), each shaped (steps, instruments)"""
+        n = len(self.symbols)
+        market = self.rng.standard_normal((steps, 1))
+        sector = self.rng.standard_normal((steps, len(SECTORS)))[:, self.sector_codes]
+        shocks = (
+            self.market_loading * market
+            + self.sector_loading * sector
+            + self.idiosyncratic_loading * self.rng.standard_normal((steps, n))
+        )
+        sigma = self.volatility * np.sqrt(self.dt)
+        log_returns = (self.drift - 0.5 * self.volatility ** 2) * self.dt + sigma * shocks
+        prices = self.prices * np.exp(np.cumsum(log_returns, axis=0))
+
+        # Per-step volume: lognormal noise, boosted by the size of the move
+        activity = 1 + 2 * np.abs(shocks)
+        step_share = self.step_seconds / (6.5 * 3600)
+        noise = self.rng.lognormal(-0.125, 0.5, (steps, n))
+        volumes = (self.base_volume * step_share * activity * noise).astype(np.int64)
+
+        self.prices = prices[-1]
+        self.volumes += volumes.sum(axis=0)
+        self.steps += steps
+        return prices, volumes
+
+    def advance_clock(self, max_steps: int = 3600) -> int:
+        """Advance by the number of whole steps elapsed on the wall clock
+
+        Crossing a UTC day boundary starts a new session first.
+        """
+        day = int(time.time() // 86400)
+        if day != self._session_day:
+            self._session_day = day
+            self.new_session()
+        steps = int((time.monotonic() - self._clock) / self.step_seconds)
+        if steps > 0:
+            self._clock += steps * self.step_seconds
+            # After a long idle gap, skip ahead rather than simulate every step
+            self.simulate(min(steps, max_steps))
+        return steps
+
+    def new_session(self):
+        """Start a new trading day: reset daily volume and the change reference"""
+        self.previous_close = self.prices.copy()
+        self.volumes[:] = 0
+
+    def quote(self, i: int) -> dict:
+        price = float(self.prices[i])
+        return {
+            'price': price,
+            'change_percent': float((price / self.previous_close[i] - 1) * 100),
+            'volume': int(self.volumes[i]),
+            'name': self.names[i],
+            'sector': self.sectors[i],
+            'market_cap': float(self.market_caps[i] * price / self.previous_close[i]),
+        }
+
+    def quotes(self, symbols: Optional[List[str]] = None) -> Dict[str, dict]:
+        """Latest quotes in the QuoteSource shape; unknown symbols are omitted"""
+        if symbols is None:
+            return {symbol: self.quote(i) for i, symbol in enumerate(self.symbols)}
+        return {symbol: self.quote(self.index[symbol]) for symbol in symbols if symbol in self.index}
+
+    def universe(self) -> List[dict]:
+        """Instrument definitions shaped like Stock documents"""
+        return [
+            {'symbol': symbol, **self.quote(i)}
+            for i, symbol in enumerate(self.symbols)
+        ]
+
+    def history(self, symbol: str, bars: int, bar_seconds: float, substeps: int = 8) -> List[dict]:
+        """OHLCV bars for one symbol ending at its current price, oldest first
+
+        Paths are drawn independently of the live state, so history is
+        self-consistent per call rather than across calls.
+        """
+        i = self.index[symbol]
+        dt = bar_seconds / substeps / TRADING_SECONDS_PER_YEAR
+        sigma = self.volatility[i] * np.sqrt(dt)
+        shocks = self.rng.standard_normal(bars * substeps)
+        log_returns = (self.drift[i] - 0.5 * self.volatility[i] ** 2) * dt + sigma * shocks
+        # Walk backwards from the current price so the last close matches the quote
+        path = self.prices[i] * np.exp(np.cumsum(log_returns) - log_returns.sum())
+        path = path.reshape(bars, substeps)
+        opens = np.concatenate([[path[0, 0] * np.exp(-log_returns[0])], path[:-1, -1]])
+        highs = np.maximum(path.max(axis=1), opens)
+        lows = np.minimum(path.min(axis=1), opens)
+        activity = 1 + 2 * np.abs(shocks.reshape(bars, substeps)).mean(axis=1)
+        noise = self.rng.lognormal(-0.125, 0.5, bars)
+        volumes = (self.base_volume[i] * bar_seconds / (6.5 * 3600) * activity * noise).astype(np.int64)
+
+        end = time.time()
+        return [
+            {
+                'ts': end - (bars - k) * bar_seconds,
+                'open': float(opens[k]),
+                'high': float(highs[k]),
+                'low': float(lows[k]),
+                'close': float(path[k, -1]),
+                'volume': int(volumes[k]),
+            }
+            for k in range(bars)
+        ]
@@ -0,0 +1,235 @@
+from typing import Dict, List, Optional
+from datetime import datetime
+
+import numpy as np
+from pymongo import UpdateOne
+
+from app.schemas.portfolio import (
+    LotCreate,
+    HoldingValuation,
+    SectorExposure,
+    PortfolioResponse
+)
+from app.models.portfolio import Portfolio, Holding, Lot
+from app.models.stock import Stock
+from app.services.stock_screener import stock_screener
+from mongoengine.errors import ValidationError
+
+
+UNKNOWN_SECTOR = "Unknown"
+
+
+def value_positions(
+    owners: np.ndarray,
+    quantity: np.ndarray,
+    cost_basis: np.ndarray,
+    price: np.ndarray,
+    n_owners: int
+):
+    """Vectorized valuation of a flat array of positions
+
+    Positions belong to portfolios via `owners`. Positions without a
+    price (NaN) are carried at cost so they do not distort P&L.
+    Returns per-position market value and P&L plus per-owner totals.
+    """
+    market_value = np.where(np.isnan(price), cost_basis, quantity * price)
+    unrealized_pnl = market_value - cost_basis
+    total_value = np.bincount(owners, weights=market_value, minlength=n_owners)
+    total_cost = np.bincount(owners, weights=cost_basis, minlength=n_owners)
+    return market_value, unrealized_pnl, total_value, total_cost
+
+
+def _percent(numerator: float, denominator: float) -> Optional[float]:
+    return float(numerator / denominator * 100) if denominator else None
+
+
+class PortfolioService:
+    """Service layer for Portfolio holdings and valuation"""
+
+    REVALUE_CHUNK_SIZE = 5000
+
+    def __init__(self):
+        pass
+
+    def _get_or_create(self, user_id: str) -> Portfolio:
+        portfolio = Portfolio.objects(user_id=user_id).first()
+        if portfolio is None:
+            portfolio = Portfolio(user_id=user_id, holdings=[])
+        return portfolio
+
+    async def get_portfolio(self, user_id: str) -> PortfolioResponse:
+        """Get a User's portfolio valued at current Stock prices"""
+        return self._value_portfolio(self._get_or_create(user_id))
+
+    async def add_lot(self, user_id: str, lot_data: LotCreate) -> PortfolioResponse:
+        """Record a purchase lot, creating the holding if needed"""
+        try:
+            portfolio = self._get_or_create(user_id)
+            symbol = lot_data.symbol.upper()
+            holding = portfolio.get_holding(symbol)
+            if holding is None:
+                holding = Holding(symbol=symbol, lots=[])
+                portfolio.holdings.append(holding)
+            holding.add_lot(Lot(
+                quantity=lot_data.quantity,
+                price=lot_data.price,
+                acquired_at=lot_data.acquired_at or datetime.utcnow()
+            ))
+            portfolio.save()
+            return self._value_portfolio(portfolio)
+        except ValidationError as e:
+            raise ValueError(f"Validation error: {e}")
+
+    async def remove_holding(self, user_id: str, symbol: str) -> Optional[PortfolioResponse]:
+        """Remove a holding with all of its lots"""
+        portfolio = Portfolio.objects(user_id=user_id).first()
+        if portfolio is None or portfolio.get_holding(symbol.upper()) is None:
+            return None
+        portfolio.holdings = [h for h in portfolio.holdings if h.symbol != symbol.upper()]
+        portfolio.save()
+        return self._value_portfolio(portfolio)
+
+    def _value_portfolio(self, portfolio: Portfolio) -> PortfolioResponse:
+        """Value one portfolio with a single batched price query"""
+        holdings = portfolio.holdings
+        symbols = [holding.symbol for holding in holdings]
+        quotes = {
+            doc['symbol']: doc
+            for doc in Stock.objects(symbol__in=symbols).only('symbol', 'price', 'sector').as_pymongo()
+        } if symbols else {}
+
+        n = len(holdings)
+        quantity = np.fromiter((h.quantity for h in holdings), dtype=np.float64, count=n)
+        cost_basis = np.fromiter((h.cost_basis for h in holdings), dtype=np.float64, count=n)
+        price = np.fromiter(
+            (quotes.get(s, {}).get('price', np.nan) for s in symbols),
+            dtype=np.float64,
+            count=n
+        )
+        sectors = [quotes.get(s, {}).get('sector') or UNKNOWN_SECTOR for s in symbols]
+
+        market_value, unrealized_pnl, total_value, total_cost = value_positions(
+            np.zeros(n, dtype=np.int64), quantity, cost_basis, price, 1
+        )
+        total_value, total_cost = float(total_value[0]), float(total_cost[0])
+        weights = market_value / total_value if total_value else np.zeros(n)
+
+        sector_names, sector_codes = np.unique(np.array(sectors, dtype=object), return_inverse=True) \
+            if n else (np.array([], dtype=object), np.array([], dtype=np.int64))
+        sector_values = np.bincount(sector_codes, weights=market_value, minlength=len(sector_names))
+
+        return PortfolioResponse(
+            user_id=portfolio.user_id,
+            market_value=total_value,
+            cost_basis=total_cost,
+            unrealized_pnl=total_value - total_cost,
+            unrealized_pnl_percent=_percent(total_value - total_cost, total_cost),
+            holdings=[
+                HoldingValuation(
+                    symbol=symbols[i],
+                    quantity=float(quantity[i]),
+                    cost_basis=float(cost_basis[i]),
+                    price=None if np.isnan(price[i]) else float(price[i]),
+                    market_value=float(market_value[i]),
+                    unrealized_pnl=float(unrealized_pnl[i]),
+                    unrealized_pnl_percent=_percent(unrealized_pnl[i], cost_basis[i]),
+                    weight=float(weights[i]),
+                    sector=sectors[i]
+                )
+                for i in range(n)
+            ],
+            sector_exposure=[
+                SectorExposure(
+                    sector=str(sector_names[i]),
+                    market_value=float(sector_values[i]),
+                    weight=float(sector_values[i] / total_value) if total_value else 0.0
+                )
+                for i in np.argsort(-sector_values)
+            ],
+            valued_at=datetime.utcnow()
+        )
+
+    async def revalue_all(self, chunk_size: int = REVALUE_CHUNK_SIZE) -> Dict[str, float]:
+        """Revalue every portfolio in chunks and store the result on each document
+
+        Prices are read with one scan of the stocks collection; each chunk
+        of portfolios is valued with vectorized math and written back with
+        a single unordered bulk write.
+        """
+        started = datetime.utcnow()
+        stock_screener.load()
+        collection = Portfolio._get_collection()
+        cursor = collection.find(
+            {},
+            {'holdings.symbol': 1, 'holdings.quantity': 1, 'holdings.cost_basis': 1}
+        ).batch_size(chunk_size)
+
+        portfolios = 0
+        positions = 0
+        chunk: List[dict] = []
+        for doc in cursor:
+            chunk.append(doc)
+            if len(chunk) >= chunk_size:
+                positions += self._revalue_chunk(collection, chunk, started)
+                portfolios += len(chunk)
+                chunk = []
+        if chunk:
+            positions += self._revalue_chunk(collection, chunk, started)
+            portfolios += len(chunk)
+
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        return {
+            'portfolios': portfolios,
+            'positions': positions,
+            'elapsed_seconds': elapsed
+        }
+
+    def _revalue_chunk(self, collection, chunk: List[dict], valued_at: datetime) -> int:
+        """Value a chunk of raw portfolio documents and bulk write the results"""
+        owners: List[int] = []
+        symbols: List[str] = []
+        quantity: List[float] = []
+        cost_basis: List[float] = []
+        for owner, doc in enumerate(chunk):
+            for holding in doc.get('holdings', []):
+                owners.append(owner)
+                symbols.append(holding['symbol'])
+                quantity.append(holding.get('quantity', 0.0))
+                cost_basis.append(holding.get('cost_basis', 0.0))
+
+        n_owners = len(chunk)
+        owners_arr = np.asarray(owners, dtype=np.int64)
+        cost_arr = np.asarray(cost_basis, dtype=np.float64)
+        price, sector_codes, sector_names = stock_screener.lookup(symbols)
+        market_value, _, total_value, total_cost = value_positions(
+            owners_arr, np.asarray(quantity, dtype=np.float64), cost_arr, price, n_owners
+        )
+
+        # Sector exposure per (owner, sector) pair; code -1 is the unknown sector
+        sector_names = sector_names + [UNKNOWN_SECTOR]
+        codes = np.where(sector_codes < 0, len(sector_names) - 1, sector_codes)
+        pair_keys, pair_index = np.unique(owners_arr * len(sector_names) + codes, return_inverse=True)
+        pair_values = np.bincount(pair_index, weights=market_value, minlength=len(pair_keys))
+        exposure: List[list] = [[] for _ in range(n_owners)]
+        for key, value in zip(pair_keys.tolist(), pair_values.tolist()):
+            owner, code = divmod(key, len(sector_names))
+            exposure[owner].append({'sector': sector_names[code], 'market_value': value})
+
+        requests = [
+            UpdateOne(
+                {'_id': doc['_id']},
+                {'$set': {
+                    'valuation': {
+                        'market_value': float(total_value[i]),
+                        'cost_basis': float(total_cost[i]),
+                        'unrealized_pnl': float(total_value[i] - total_cost[i]),
+                        'sector_exposure': exposure[i]
+                    },
+                    'valued_at': valued_at
+                }}
+            )
+            for i, doc in enumerate(chunk)
+        ]
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+        return len(symbols)
@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.schemas.user import UserResponse
+
+
+class ProfileCache:
+    """Bounded in-process LRU of user profiles keyed by user id
+
+    Entries carry the user's profile_version. A lookup names the minimum
+    version it will accept (the one in the caller's token), so a profile
+    is served from memory unless this worker has never seen that version.
+    Local mutations replace entries directly; changes made by other
+    workers arrive through the invalidation bus.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, UserResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, min_version: int = 0) -> Optional[UserResponse]:
+        with self._lock:
+            user = self._entries.get(user_id)
+            if user is None or user.profile_version < min_version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return user
+
+    def put(self, user: UserResponse):
+        with self._lock:
+            current = self._entries.get(user.id)
+            # Never replace a newer profile with an older read
+            if current is not None and current.profile_version > user.profile_version:
+                return
+            self._entries[user.id] = user
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str, up_to_version: Optional[int] = None):
+        """Drop a cached profile, or only if it is not newer than `up_to_version`
+
+        An entry at the changed version itself is dropped too: it may have
+        been read before the change it is being invalidated for.
+        """
+        with self._lock:
+            user = self._entries.get(user_id)
+            if user is not None and (up_to_version is None or user.profile_version <= up_to_version):
+                del self._entries[user_id]
+
+    def handle_invalidation(self, event):
+        """Apply a users change published on the invalidation bus"""
+        if event.operation == 'reset':
+            with self._lock:
+                self._entries.clear()
+        elif event.operation == 'delete' or event.document is None:
+            self.invalidate(str(event.document_id))
+        else:
+            self.invalidate(str(event.document_id), event.document.get('profile_version', 0))
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+profile_cache = ProfileCache(settings.PROFILE_CACHE_MAX_ENTRIES)
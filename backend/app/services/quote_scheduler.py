@@ -0,0 +1,246 @@
+import asyncio
+import heapq
+import math
+import random
+import time
+from collections import deque
+from datetime import datetime, time as dt_time
+from typing import Deque, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.quote_source import QuoteSource
+from app.services.stock_service import StockService
+from app.utils.lease import MongoLease
+
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Whether US equity markets are in regular trading hours"""
+    local = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    return local.weekday() < 5 and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+
+def _summary(samples: Deque[float]) -> dict:
+    if not samples:
+        return {'count': 0, 'p50': None, 'p95': None, 'max': None}
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max': ordered[-1],
+    }
+
+
+class QuoteRefreshScheduler:
+    """Background task that keeps Stock prices fresh
+
+    The refresh universe is the deduplicated union of all watchlist symbols
+    and the predefined companies. Each symbol gets its own due time: popular
+    symbols refresh more often, everything slows down outside market hours,
+    and symbols nobody watches back off exponentially.
+
+    Every API worker starts a scheduler, but only the one holding the
+    `quote-refresh` lease fetches quotes, so upstream quota and writes do
+    not scale with the worker count. The others take over within
+    QUOTE_REFRESH_LEASE_SECONDS if the holder dies.
+    """
+
+    SAMPLE_WINDOW = 1000
+
+    def __init__(
+        self,
+        source: QuoteSource,
+        stock_service: Optional[StockService] = None,
+        lease: Optional[MongoLease] = None
+    ):
+        self.source = source
+        self.stock_service = stock_service or StockService()
+        self.batch_size = min(settings.QUOTE_REFRESH_BATCH_SIZE, source.max_batch_size)
+        self.lease = lease or MongoLease('quote-refresh', settings.QUOTE_REFRESH_LEASE_SECONDS)
+        self.leader = False
+        self._lease_checked_at = -math.inf
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchers: Dict[str, int] = {}
+        self._due: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._idle_rounds: Dict[str, int] = {}
+        self._last_refreshed: Dict[str, float] = {}
+        self._target_interval: Dict[str, float] = {}
+        self._universe_loaded_at = 0.0
+
+        self._lag: Deque[float] = deque(maxlen=self.SAMPLE_WINDOW)
+        self._jitter: Deque[float] = deque(maxlen=self.SAMPLE_WINDOW)
+        self._batch_sizes: Deque[int] = deque(maxlen=self.SAMPLE_WINDOW)
+        self._refreshed = 0
+        self._failures = 0
+        self._last_error: Optional[str] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.leader:
+            self.leader = False
+            try:
+                await asyncio.to_thread(self.lease.release)
+            except Exception as e:
+                print(f"Releasing the quote refresh lease failed: {e}")
+
+    async def _check_lease(self) -> bool:
+        """Take or renew the lease a few times per TTL; returns whether this worker leads"""
+        now = time.monotonic()
+        if now - self._lease_checked_at < self.lease.ttl / 3:
+            return self.leader
+        self._lease_checked_at = now
+        try:
+            leader = await asyncio.to_thread(self.lease.acquire)
+        except Exception as e:
+            self._last_error = str(e)
+            print(f"Quote refresh lease check failed: {e}")
+            leader = False
+        if leader and not self.leader:
+            # Watchlists may have changed while another worker was refreshing
+            self._universe_loaded_at = 0.0
+        self.leader = leader
+        return leader
+
+    @staticmethod
+    def _load_watchers() -> Dict[str, int]:
+        """Count watchers per symbol across all user watchlists"""
+        pipeline = [
+            {'$unwind': '$watchlist'},
+            {'$group': {'_id': '$watchlist', 'watchers': {'$sum': 1}}},
+        ]
+        watchers = {
+            doc['_id'].upper(): doc['watchers']
+            for doc in User._get_collection().aggregate(pipeline)
+            if doc['_id']
+        }
+        for company in StockService.PREDEFINED_COMPANIES:
+            watchers.setdefault(company['symbol'], 0)
+        return watchers
+
+    async def refresh_universe(self):
+        watchers = await asyncio.to_thread(self._load_watchers)
+        now = time.monotonic()
+        for symbol in watchers.keys() - self._due.keys():
+            # Spread first refreshes over one tick so startup is not one burst
+            self._schedule(symbol, now + random.uniform(0, settings.QUOTE_REFRESH_TICK_SECONDS))
+        for symbol in self._due.keys() - watchers.keys():
+            del self._due[symbol]
+            self._idle_rounds.pop(symbol, None)
+            self._last_refreshed.pop(symbol, None)
+            self._target_interval.pop(symbol, None)
+        # Drop heap entries for removed symbols once they dominate the heap
+        if len(self._heap) > 2 * len(watchers):
+            self._heap = [(due, symbol) for due, symbol in self._heap if self._due.get(symbol) == due]
+            heapq.heapify(self._heap)
+        self._watchers = watchers
+        self._universe_loaded_at = now
+
+    def _schedule(self, symbol: str, due: float):
+        self._due[symbol] = due
+        heapq.heappush(self._heap, (due, symbol))
+
+    def interval_for(self, symbol: str, market_open: bool) -> float:
+        """Seconds until the next refresh of `symbol`"""
+        watchers = self._watchers.get(symbol, 0)
+        if watchers > 0:
+            self._idle_rounds.pop(symbol, None)
+            interval = settings.QUOTE_REFRESH_BASE_INTERVAL / (1 + math.log2(watchers))
+        else:
+            idle_rounds = self._idle_rounds.get(symbol, 0)
+            self._idle_rounds[symbol] = idle_rounds + 1
+            interval = settings.QUOTE_REFRESH_BASE_INTERVAL * 2 ** min(idle_rounds, 16)
+        if not market_open:
+            interval *= settings.QUOTE_REFRESH_OFF_HOURS_MULTIPLIER
+        return min(max(interval, settings.QUOTE_REFRESH_MIN_INTERVAL), settings.QUOTE_REFRESH_MAX_INTERVAL)
+
+    def _pop_due(self, now: float) -> List[str]:
+        due_symbols = []
+        limit = self.batch_size * settings.QUOTE_REFRESH_MAX_BATCHES_PER_ROUND
+        while self._heap and self._heap[0][0] <= now and len(due_symbols) < limit:
+            due, symbol = heapq.heappop(self._heap)
+            # Skip stale heap entries left behind by rescheduling or removal
+            if self._due.get(symbol) != due:
+                continue
+            self._lag.append(now - due)
+            due_symbols.append(symbol)
+        return due_symbols
+
+    async def run_round(self):
+        """Refresh every symbol that is currently due, in batches"""
+        now = time.monotonic()
+        if now - self._universe_loaded_at >= settings.QUOTE_REFRESH_UNIVERSE_INTERVAL:
+            await self.refresh_universe()
+
+        due_symbols = self._pop_due(now)
+        market_open = is_market_open()
+        for start in range(0, len(due_symbols), self.batch_size):
+            batch = due_symbols[start:start + self.batch_size]
+            self._batch_sizes.append(len(batch))
+            try:
+                quotes = await self.source.fetch_quotes(batch)
+                await self.stock_service.apply_quotes(quotes)
+                self._refreshed += len(quotes)
+            except Exception as e:
+                self._failures += 1
+                self._last_error = str(e)
+                print(f"Quote refresh failed for {batch}: {e}")
+
+            finished = time.monotonic()
+            for symbol in batch:
+                if symbol not in self._due:
+                    continue
+                previous = self._last_refreshed.get(symbol)
+                target = self._target_interval.get(symbol)
+                if previous is not None and target is not None:
+                    self._jitter.append(abs((finished - previous) - target))
+                interval = self.interval_for(symbol, market_open)
+                self._last_refreshed[symbol] = finished
+                self._target_interval[symbol] = interval
+                self._schedule(symbol, finished + interval)
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._check_lease():
+                    await self.run_round()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"Quote refresh round failed: {e}")
+            await asyncio.sleep(settings.QUOTE_REFRESH_TICK_SECONDS)
+
+    def stats(self) -> dict:
+        """Refresh lag, jitter and batch size statistics for monitoring"""
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'leader': self.leader,
+            'market_open': is_market_open(),
+            'symbols': len(self._due),
+            'watched_symbols': sum(1 for count in self._watchers.values() if count > 0),
+            'refreshed': self._refreshed,
+            'failures': self._failures,
+            'last_error': self._last_error,
+            'lag_seconds': _summary(self._lag),
+            'jitter_seconds': _summary(self._jitter),
+            'batch_size': _summary(self._batch_sizes),
+        }
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import Dict, List
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from app.core.config import settings
+from app.services.market_simulator import MarketSimulator
+from app.services.stock_service import StockService
+
+
+class QuoteSource(ABC):
+    """Pluggable source of latest quotes for a batch of symbols"""
+
+    max_batch_size: int = 8
+
+    @abstractmethod
+    async def fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        """Return {symbol: {price, change_percent, volume[, name]}} for known symbols"""
+
+
+class TwelveDataQuoteSource(QuoteSource):
+    """Quote source backed by the Twelve Data /quote endpoint"""
+
+    def __init__(self, api_key: str = None, base_url: str = None, timeout: float = 10.0):
+        self.api_key = api_key or settings.TWELVE_DATA_SECRET_API_KEY
+        self.base_url = (base_url or settings.TWELVE_DATA_BASE_URL).rstrip('/')
+        self.timeout = timeout
+        self.max_batch_size = settings.QUOTE_REFRESH_BATCH_SIZE
+
+    def _get(self, path: str, params: dict) -> dict:
+        query = urlencode({**params, 'apikey': self.api_key})
+        with urlopen(f"{self.base_url}{path}?{query}", timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    async def fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        if not symbols:
+            return {}
+        payload = await asyncio.to_thread(self._get, '/quote', {'symbol': ','.join(symbols)})
+        # Request-level errors (rate limits, bad API key) come back as one error
+        # object; for a single symbol, 400/404 only means the symbol is unknown
+        if payload.get('status') == 'error' and not (len(symbols) == 1 and payload.get('code') in (400, 404)):
+            raise ValueError(f"Twelve Data error {payload.get('code')}: {payload.get('message')}")
+        # A single-symbol request returns the quote itself rather than a mapping
+        if len(symbols) == 1:
+            payload = {symbols[0]: payload}
+
+        quotes = {}
+        for symbol, quote in payload.items():
+            if not isinstance(quote, dict) or quote.get('status') == 'error' or 'close' not in quote:
+                continue
+            quotes[symbol] = {
+                'price': float(quote['close']),
+                'change_percent': float(quote['percent_change']) if quote.get('percent_change') else None,
+                'volume': int(quote['volume']) if quote.get('volume') else None,
+                'name': quote.get('name'),
+            }
+        return quotes
+
+
+class SimulatedQuoteSource(QuoteSource):
+    """Quote source backed by an in-process MarketSimulator
+
+    The simulated market advances with the wall clock, one step every
+    SIMULATOR_STEP_SECONDS, and leads with the predefined companies so
+    watched symbols resolve.
+    """
+
+    def __init__(self, simulator: MarketSimulator = None):
+        self.simulator = simulator or MarketSimulator(
+            instruments=settings.SIMULATOR_INSTRUMENTS,
+            seed=settings.SIMULATOR_SEED,
+            step_seconds=settings.SIMULATOR_STEP_SECONDS,
+            seed_companies=StockService.PREDEFINED_COMPANIES
+        )
+        self.max_batch_size = len(self.simulator)
+
+    async def fetch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        self.simulator.advance_clock()
+        return self.simulator.quotes(symbols)
+
+
+QUOTE_SOURCES = {
+    'twelvedata': TwelveDataQuoteSource,
+    'simulated': SimulatedQuoteSource,
+}
+
+
+def get_quote_source(name: str = None) -> QuoteSource:
+    """Instantiate the configured quote source"""
+    name = name or settings.QUOTE_SOURCE
+    try:
+        return QUOTE_SOURCES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown quote source '{name}'")
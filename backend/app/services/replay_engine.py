@@ -0,0 +1,409 @@
+import asyncio
+import heapq
+import math
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.models.price_bar import PriceBar
+from app.services.bar_aggregator import BarAggregator
+from app.services.stock_service import StockService
+
+
+# Ticks handed to the sink and strategies per step of a columnar replay
+COLUMN_CHUNK_SIZE = 10000
+
+
+class Tick(NamedTuple):
+    ts: float  # epoch seconds
+    symbol: str
+    price: float
+    volume: int
+
+
+class Fill(NamedTuple):
+    ts: float
+    symbol: str
+    quantity: float  # negative for sells
+    price: float
+    commission: float
+
+
+def _epoch(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _bar_cursor(symbol: str, interval: str, start: Optional[datetime], end: Optional[datetime], batch_size: int):
+    query = {'symbol': symbol, 'interval': interval}
+    if start or end:
+        query['ts'] = {}
+        if start:
+            query['ts']['$gte'] = start
+        if end:
+            query['ts']['$lt'] = end
+    return PriceBar._get_collection().find(
+        query, {'_id': 0, 'ts': 1, 'close': 1, 'volume': 1}
+    ).sort('ts', 1).batch_size(batch_size)
+
+
+def bar_ticks(
+    symbol: str,
+    interval: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = 10000
+) -> Iterator[Tick]:
+    """Stream stored bars for one symbol as ticks at each bar's close, oldest first"""
+    for doc in _bar_cursor(symbol, interval, start, end, batch_size):
+        yield Tick(_epoch(doc['ts']), symbol, doc['close'], doc.get('volume') or 0)
+
+
+def bar_columns(
+    symbol: str,
+    interval: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = 10000
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Load stored bars for one symbol as (ts, close, volume) arrays, oldest first"""
+    docs = list(_bar_cursor(symbol, interval, start, end, batch_size))
+    # Naive datetimes from pymongo are UTC, as numpy assumes
+    ts = np.array([doc['ts'] for doc in docs], dtype='datetime64[us]').astype(np.int64) / 1e6
+    close = np.fromiter((doc['close'] for doc in docs), dtype=np.float64, count=len(docs))
+    volume = np.fromiter((doc.get('volume') or 0 for doc in docs), dtype=np.int64, count=len(docs))
+    return ts, close, volume
+
+
+def _last_prices(codes: np.ndarray, prices: np.ndarray) -> Dict[int, float]:
+    """Symbol code -> price of its last tick in a chunk"""
+    # The last tick is the first occurrence in the reversed chunk
+    present, first = np.unique(codes[::-1], return_index=True)
+    return dict(zip(present.tolist(), prices[len(codes) - 1 - first].tolist()))
+
+
+class ReplaySink(ABC):
+    """Destination for replayed ticks"""
+
+    @abstractmethod
+    async def emit(self, tick: Tick):
+        """Consume one tick"""
+
+    async def emit_columns(
+        self,
+        ts: np.ndarray,
+        codes: np.ndarray,
+        prices: np.ndarray,
+        volumes: np.ndarray,
+        symbols: List[str]
+    ):
+        """Emit a chunk of ticks given as columns; `codes` index into `symbols`"""
+        for tick_ts, code, price, volume in zip(ts.tolist(), codes.tolist(), prices.tolist(), volumes.tolist()):
+            await self.emit(Tick(tick_ts, symbols[code], price, volume))
+
+    async def close(self):
+        pass
+
+
+class DryRunSink(ReplaySink):
+    """Discard ticks, keeping only counts and the last price per symbol"""
+
+    def __init__(self):
+        self.ticks = 0
+        self.last_prices: Dict[str, float] = {}
+
+    async def emit(self, tick: Tick):
+        self.ticks += 1
+        self.last_prices[tick.symbol] = tick.price
+
+    async def emit_columns(self, ts, codes, prices, volumes, symbols):
+        self.ticks += len(ts)
+        for code, price in _last_prices(codes, prices).items():
+            self.last_prices[symbols[code]] = price
+
+
+class StockServiceSink(ReplaySink):
+    """Drive ticks through StockService.apply_quotes, the live quote write path
+
+    Ticks are coalesced to the latest quote per symbol and written in
+    batches. This updates the real stocks collection and the screener, so
+    point it at a test database. Tick volume is per bar, so Stock.volume
+    gets the running total for the tick's UTC day, as a live feed reports.
+
+    Replayed ticks bypass the live bar aggregator, which would stamp them
+    with wall-clock time. Pass `aggregator` (constructed with
+    use_wall_clock=False) to resample them at their replayed times; it
+    writes price_bars, so use it with another interval or database.
+    """
+
+    def __init__(
+        self,
+        stock_service: Optional[StockService] = None,
+        batch_size: int = 500,
+        aggregator: Optional[BarAggregator] = None
+    ):
+        self.stock_service = stock_service or StockService()
+        self.batch_size = batch_size
+        self.aggregator = aggregator
+        self.ticks = 0
+        self.writes = 0
+        self._pending: Dict[str, dict] = {}
+        # symbol -> (UTC day number, volume so far that day)
+        self._sessions: Dict[str, Tuple[int, int]] = {}
+
+    async def emit(self, tick: Tick):
+        self.ticks += 1
+        day = int(tick.ts // 86400)
+        session_day, volume = self._sessions.get(tick.symbol, (day, 0))
+        volume = tick.volume + (volume if session_day == day else 0)
+        self._sessions[tick.symbol] = (day, volume)
+        self._pending[tick.symbol] = {'price': tick.price, 'volume': volume}
+        if self.aggregator is not None:
+            self.aggregator.add_tick(tick.symbol, tick.price, volume, ts=tick.ts)
+        if len(self._pending) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            self.writes += await self.stock_service.apply_quotes(pending, aggregate=False)
+        if self.aggregator is not None:
+            await self.aggregator.flush_async()
+
+    async def close(self):
+        if self.aggregator is not None:
+            # Close every open bar; no later ticks are coming
+            self.aggregator.advance(math.inf)
+        await self._flush()
+
+
+class BacktestContext:
+    """Account state and order entry exposed to strategies
+
+    Market orders fill immediately at the symbol's latest replayed price.
+    """
+
+    def __init__(self, cash: float, commission: float):
+        self.cash = cash
+        self.initial_cash = cash
+        self.commission = commission
+        self.now = 0.0
+        self.prices: Dict[str, float] = {}
+        self.positions: Dict[str, float] = {}
+        self.cost_basis: Dict[str, float] = {}
+        self.realized_pnl = 0.0
+        self.fills: List[Fill] = []
+
+    def position(self, symbol: str) -> float:
+        return self.positions.get(symbol, 0.0)
+
+    def price(self, symbol: str) -> Optional[float]:
+        return self.prices.get(symbol)
+
+    def order(self, symbol: str, quantity: float) -> Optional[Fill]:
+        """Buy (positive) or sell (negative) at the latest price"""
+        price = self.prices.get(symbol)
+        if price is None or quantity == 0:
+            return None
+        position = self.positions.get(symbol, 0.0)
+        basis = self.cost_basis.get(symbol, 0.0)
+
+        # Realize P&L on the part of the order that reduces the position
+        if position and (position > 0) != (quantity > 0):
+            closed = min(abs(quantity), abs(position)) * (1 if position > 0 else -1)
+            average = basis / position
+            self.realized_pnl += closed * (price - average)
+            basis -= closed * average
+            position -= closed
+            quantity_left = quantity + closed
+        else:
+            quantity_left = quantity
+        position += quantity_left
+        basis += quantity_left * price
+
+        self.positions[symbol] = position
+        self.cost_basis[symbol] = basis if position else 0.0
+        self.cash -= quantity * price + self.commission
+        self.realized_pnl -= self.commission
+        fill = Fill(self.now, symbol, quantity, price, self.commission)
+        self.fills.append(fill)
+        return fill
+
+    def buy(self, symbol: str, quantity: float) -> Optional[Fill]:
+        return self.order(symbol, abs(quantity))
+
+    def sell(self, symbol: str, quantity: float) -> Optional[Fill]:
+        return self.order(symbol, -abs(quantity))
+
+    def unrealized_pnl(self) -> float:
+        return sum(
+            quantity * self.prices[symbol] - self.cost_basis.get(symbol, 0.0)
+            for symbol, quantity in self.positions.items()
+            if quantity and symbol in self.prices
+        )
+
+    def equity(self) -> float:
+        return self.cash + sum(
+            quantity * self.prices.get(symbol, 0.0) for symbol, quantity in self.positions.items()
+        )
+
+
+class Strategy:
+    """User-defined strategy callbacks; override what you need"""
+
+    def on_start(self, ctx: BacktestContext):
+        pass
+
+    def on_tick(self, tick: Tick, ctx: BacktestContext):
+        pass
+
+    def on_finish(self, ctx: BacktestContext):
+        pass
+
+
+class BuyAndHoldStrategy(Strategy):
+    """Buy a fixed quantity of each symbol on its first tick"""
+
+    def __init__(self, quantity: float = 1.0):
+        self.quantity = quantity
+
+    def on_tick(self, tick: Tick, ctx: BacktestContext):
+        if not ctx.position(tick.symbol):
+            ctx.buy(tick.symbol, self.quantity)
+
+
+class ReplayEngine:
+    """Replay stored price history in timestamp order through a sink and strategies
+
+    `speed` is a multiple of real time (1.0 = real time); None replays as
+    fast as possible. Paced and `vectorized=False` replays merge per-symbol
+    bar streams with a k-way heap merge, so memory stays at one cursor
+    batch per symbol. Unpaced replays load every symbol's bars as arrays,
+    merge them with one sort and hand them to the sink in chunks, so the
+    sink sees each chunk before strategies do.
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        interval: str = '1m',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        speed: Optional[float] = None,
+        sink: Optional[ReplaySink] = None,
+        strategies: Optional[List[Strategy]] = None,
+        cash: float = 100_000.0,
+        commission: float = 0.0,
+        vectorized: bool = True
+    ):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.interval = interval
+        self.start = start
+        self.end = end
+        self.speed = speed
+        self.sink = sink or DryRunSink()
+        self.strategies = strategies or []
+        self.context = BacktestContext(cash, commission)
+        self.vectorized = vectorized
+
+    def ticks(self) -> Iterator[Tick]:
+        streams = [bar_ticks(symbol, self.interval, self.start, self.end) for symbol in self.symbols]
+        return heapq.merge(*streams)
+
+    def tick_columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Every tick as (ts, symbol code, price, volume) columns in replay order
+
+        Symbol codes index into self.symbols. Ties on ts are broken by
+        symbol, matching the heap merge.
+        """
+        loaded = [bar_columns(symbol, self.interval, self.start, self.end) for symbol in self.symbols]
+        ts = np.concatenate([columns[0] for columns in loaded] or [np.empty(0)])
+        prices = np.concatenate([columns[1] for columns in loaded] or [np.empty(0)])
+        volumes = np.concatenate([columns[2] for columns in loaded] or [np.empty(0, dtype=np.int64)])
+        codes = np.concatenate(
+            [np.full(len(columns[0]), code, dtype=np.int32) for code, columns in enumerate(loaded)]
+            or [np.empty(0, dtype=np.int32)]
+        )
+        ranks = np.argsort(np.argsort(self.symbols, kind='stable'), kind='stable')
+        order = np.lexsort((ranks[codes], ts)) if len(ts) else np.empty(0, dtype=np.int64)
+        return ts[order], codes[order], prices[order], volumes[order]
+
+    async def run(self, ticks: Optional[Iterator[Tick]] = None) -> dict:
+        if ticks is None and self.vectorized and not self.speed:
+            return await self._run_columns()
+        ctx = self.context
+        for strategy in self.strategies:
+            strategy.on_start(ctx)
+
+        count = 0
+        first_ts = None
+        started = time.perf_counter()
+        for tick in ticks if ticks is not None else self.ticks():
+            if self.speed:
+                if first_ts is None:
+                    first_ts = tick.ts
+                delay = (tick.ts - first_ts) / self.speed - (time.perf_counter() - started)
+                if delay > 0.001:
+                    await asyncio.sleep(delay)
+            ctx.now = tick.ts
+            ctx.prices[tick.symbol] = tick.price
+            await self.sink.emit(tick)
+            for strategy in self.strategies:
+                strategy.on_tick(tick, ctx)
+            count += 1
+            if not self.speed and count % 10000 == 0:
+                # Let other tasks run during as-fast-as-possible replays
+                await asyncio.sleep(0)
+        await self.sink.close()
+
+        for strategy in self.strategies:
+            strategy.on_finish(ctx)
+        return self._result(count, time.perf_counter() - started)
+
+    async def _run_columns(self) -> dict:
+        ctx = self.context
+        for strategy in self.strategies:
+            strategy.on_start(ctx)
+
+        started = time.perf_counter()
+        ts, codes, prices, volumes = await asyncio.to_thread(self.tick_columns)
+        symbols = self.symbols
+        for chunk_start in range(0, len(ts), COLUMN_CHUNK_SIZE):
+            chunk = slice(chunk_start, chunk_start + COLUMN_CHUNK_SIZE)
+            await self.sink.emit_columns(ts[chunk], codes[chunk], prices[chunk], volumes[chunk], symbols)
+            if self.strategies:
+                for tick_ts, code, price, volume in zip(
+                    ts[chunk].tolist(), codes[chunk].tolist(), prices[chunk].tolist(), volumes[chunk].tolist()
+                ):
+                    tick = Tick(tick_ts, symbols[code], price, volume)
+                    ctx.now = tick_ts
+                    ctx.prices[tick.symbol] = price
+                    for strategy in self.strategies:
+                        strategy.on_tick(tick, ctx)
+            # Let other tasks run between chunks
+            await asyncio.sleep(0)
+        if len(ts):
+            ctx.now = float(ts[-1])
+            for code, price in _last_prices(codes, prices).items():
+                ctx.prices[symbols[code]] = price
+        await self.sink.close()
+
+        for strategy in self.strategies:
+            strategy.on_finish(ctx)
+        return self._result(len(ts), time.perf_counter() - started)
+
+    def _result(self, count: int, elapsed: float) -> dict:
+        ctx = self.context
+        return {
+            'ticks': count,
+            'elapsed_seconds': elapsed,
+            'ticks_per_second': count / elapsed if elapsed else 0.0,
+            'fills': len(ctx.fills),
+            'realized_pnl': ctx.realized_pnl,
+            'unrealized_pnl': ctx.unrealized_pnl(),
+            'equity': ctx.equity(),
+            'return_percent': (ctx.equity() / ctx.initial_cash - 1) * 100 if ctx.initial_cash else None,
+            'positions': {symbol: quantity for symbol, quantity in ctx.positions.items() if quantity},
+        }
@@ -0,0 +1,203 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.models.price_bar import PriceBar
+from app.schemas.risk import WatchlistRiskResponse
+
+
+TRADING_DAYS_PER_YEAR = 252
+
+RiskKey = Tuple[Tuple[str, ...], int, float]
+
+
+class RiskCache:
+    """Bounded LRU of risk results keyed by (symbol set, window, confidence)
+
+    A reverse index from symbol to cache keys lets a new close for one
+    symbol drop exactly the results that depend on it.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[RiskKey, WatchlistRiskResponse]" = OrderedDict()
+        self._by_symbol: Dict[str, Set[RiskKey]] = {}
+        # Bumped by every invalidation, so results computed across one are not cached
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: RiskKey) -> Optional[WatchlistRiskResponse]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: RiskKey, result: WatchlistRiskResponse, generation: Optional[int] = None):
+        """Cache a result, unless invalidations happened since `generation` was read"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            for symbol in key[0]:
+                self._by_symbol.setdefault(symbol, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: RiskKey):
+        self._entries.pop(key, None)
+        for symbol in key[0]:
+            keys = self._by_symbol.get(symbol)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_symbol[symbol]
+
+    def invalidate_symbols(self, symbols: Iterable[str]):
+        """Drop every cached result that includes any of `symbols`"""
+        symbols = set(symbols)
+        if not symbols:
+            return
+        with self._lock:
+            self.generation += 1
+            for symbol in symbols:
+                for key in list(self._by_symbol.get(symbol, ())):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_symbol.clear()
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+risk_cache = RiskCache()
+
+
+def align_closes(
+    symbols: List[str],
+    doc_symbols: np.ndarray,
+    doc_ts: np.ndarray,
+    doc_close: np.ndarray
+) -> np.ndarray:
+    """Pivot (symbol, ts, close) rows into a dates x symbols matrix
+
+    Gaps are forward-filled per symbol; leading rows before a symbol's
+    first close stay NaN.
+    """
+    dates, date_index = np.unique(doc_ts, return_inverse=True)
+    column_of = {symbol: i for i, symbol in enumerate(symbols)}
+    symbol_index = np.fromiter((column_of[s] for s in doc_symbols), dtype=np.int64, count=len(doc_symbols))
+
+    closes = np.full((len(dates), len(symbols)), np.nan)
+    closes[date_index, symbol_index] = doc_close
+
+    # Forward fill: carry the row index of the last seen value down each column
+    rows = np.where(~np.isnan(closes), np.arange(len(dates))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return closes[rows, np.arange(len(symbols))]
+
+
+def compute_risk(closes: np.ndarray, confidence: float):
+    """Covariance, correlation, volatility and historical VaR of daily log returns"""
+    returns = np.diff(np.log(closes), axis=0)
+    covariance = np.atleast_2d(np.cov(returns, rowvar=False))
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.outer(std, std)
+    correlation = np.nan_to_num(correlation)
+    np.fill_diagonal(correlation, 1.0)
+    volatility = std * np.sqrt(TRADING_DAYS_PER_YEAR)
+    tail = (1 - confidence) * 100
+    value_at_risk = -np.percentile(returns, tail, axis=0)
+    portfolio_value_at_risk = -np.percentile(returns.mean(axis=1), tail)
+    return covariance, correlation, volatility, value_at_risk, float(portfolio_value_at_risk)
+
+
+class RiskService:
+    """Service layer for watchlist risk metrics over daily closes"""
+
+    def __init__(self, cache: RiskCache = risk_cache):
+        self.cache = cache
+
+    async def get_watchlist_risk(
+        self,
+        symbols: List[str],
+        window: int = TRADING_DAYS_PER_YEAR,
+        confidence: float = 0.95
+    ) -> WatchlistRiskResponse:
+        """Get risk metrics for a symbol set, memoized until new closes arrive"""
+        key = (tuple(sorted({s.upper() for s in symbols})), window, confidence)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation
+        # The Mongo read and NumPy work stay off the event loop
+        result = await asyncio.to_thread(self._compute, list(key[0]), window, confidence)
+        self.cache.put(key, result, generation)
+        return result
+
+    def _load_closes(self, symbols: List[str], window: int):
+        # Calendar lookback with headroom for weekends and holidays
+        since = datetime.utcnow() - timedelta(days=int(window * 365 / TRADING_DAYS_PER_YEAR) + 14)
+        cursor = PriceBar._get_collection().find(
+            {'symbol': {'$in': symbols}, 'interval': '1d', 'ts': {'$gte': since}},
+            {'_id': 0, 'symbol': 1, 'ts': 1, 'close': 1}
+        )
+        docs = list(cursor)
+        doc_symbols = np.array([doc['symbol'] for doc in docs], dtype=object)
+        doc_ts = np.array([doc['ts'] for doc in docs], dtype='datetime64[s]')
+        doc_close = np.fromiter((doc['close'] for doc in docs), dtype=np.float64, count=len(docs))
+        return doc_symbols, doc_ts, doc_close
+
+    def _compute(self, symbols: List[str], window: int, confidence: float) -> WatchlistRiskResponse:
+        doc_symbols, doc_ts, doc_close = self._load_closes(symbols, window)
+        present = set(doc_symbols.tolist())
+        usable = [s for s in symbols if s in present]
+        missing = [s for s in symbols if s not in present]
+
+        closes = align_closes(usable, doc_symbols, doc_ts, doc_close) if usable else np.empty((0, 0))
+        # Keep only dates where every usable symbol has a price, then the last window
+        complete = ~np.isnan(closes).any(axis=1) if usable else np.array([], dtype=bool)
+        closes = closes[complete][-(window + 1):]
+
+        if len(closes) < 3:
+            return WatchlistRiskResponse(
+                symbols=[],
+                missing_symbols=symbols,
+                window=0,
+                confidence=confidence,
+                correlation=[],
+                covariance=[],
+                volatility={},
+                value_at_risk={},
+                portfolio_value_at_risk=0.0,
+                computed_at=datetime.utcnow()
+            )
+
+        covariance, correlation, volatility, value_at_risk, portfolio_var = compute_risk(closes, confidence)
+        return WatchlistRiskResponse(
+            symbols=usable,
+            missing_symbols=missing,
+            window=len(closes) - 1,
+            confidence=confidence,
+            correlation=correlation.tolist(),
+            covariance=covariance.tolist(),
+            volatility=dict(zip(usable, volatility.tolist())),
+            value_at_risk=dict(zip(usable, value_at_risk.tolist())),
+            portfolio_value_at_risk=portfolio_var,
+            computed_at=datetime.utcnow()
+        )
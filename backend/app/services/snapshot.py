@@ -0,0 +1,247 @@
+import asyncio
+import json
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.stock import Stock
+from app.services.stock_screener import StockScreener, stock_screener
+
+
+MAGIC = b'SMTSNAP\0'
+FORMAT_VERSION = 1
+# magic, format version, metadata length
+PREAMBLE = struct.Struct('<8sII')
+ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(state: dict, path: str):
+    """Write exported screener state to `path` atomically
+
+    Layout: preamble, JSON metadata, then 64-byte aligned little-endian
+    arrays. Strings are stored as a UTF-8 blob plus int64 offsets.
+    """
+    symbols = [symbol.encode() for symbol in state['symbols']]
+    names = [(name or '').encode() for name in state['names']]
+    ids = [(stock_id or '').encode() for stock_id in state['ids']]
+    arrays = {
+        **{f"column.{field}": np.ascontiguousarray(column, dtype='<f8') for field, column in state['columns'].items()},
+        'sector_codes': np.ascontiguousarray(state['sector_codes'], dtype='<i4'),
+    }
+    for name, values in (('symbols', symbols), ('names', names), ('ids', ids)):
+        arrays[f"{name}.offsets"] = np.cumsum([0] + [len(value) for value in values], dtype='<i8')
+        arrays[f"{name}.blob"] = np.frombuffer(b''.join(values), dtype=np.uint8)
+
+    high_water_mark = state['high_water_mark']
+    metadata = {
+        'created_at': datetime.utcnow().isoformat(),
+        'high_water_mark': high_water_mark.isoformat() if high_water_mark else None,
+        'rows': len(symbols),
+        'sectors': state['sectors'],
+        'arrays': {},
+    }
+    # Array offsets are relative to the data section, which follows the metadata
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'count': int(array.size), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+    metadata['arrays'] = layout
+    encoded = json.dumps(metadata).encode()
+    data_start = _aligned(PREAMBLE.size + len(encoded))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    # Readers that mapped the old file keep their mapping
+    os.replace(tmp_path, path)
+
+
+def _strings(arrays: dict, name: str) -> list:
+    blob = arrays[f"{name}.blob"].tobytes()
+    offsets = arrays[f"{name}.offsets"].tolist()
+    return [blob[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+
+
+def read_snapshot(path: str) -> Optional[dict]:
+    """Map a snapshot file; numeric arrays are copy-on-write views of the mapping
+
+    Returns None when the file is missing or was written by another format version.
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) < PREAMBLE.size:
+            return None
+        magic, version, metadata_length = PREAMBLE.unpack(preamble)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            print(f"Ignoring snapshot {path}: unsupported format version {version}")
+            return None
+        metadata = json.loads(f.read(metadata_length))
+        data_start = _aligned(PREAMBLE.size + metadata_length)
+        # ACCESS_COPY keeps pages shared until the screener writes to a row
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    arrays = {
+        name: np.frombuffer(mapping, dtype=spec['dtype'], count=spec['count'], offset=data_start + spec['offset'])
+        for name, spec in metadata['arrays'].items()
+    }
+    high_water_mark = metadata['high_water_mark']
+    return {
+        'symbols': _strings(arrays, 'symbols'),
+        'names': [name or None for name in _strings(arrays, 'names')],
+        'ids': _strings(arrays, 'ids'),
+        'columns': {
+            name.split('.', 1)[1]: array for name, array in arrays.items() if name.startswith('column.')
+        },
+        'sector_codes': arrays['sector_codes'],
+        'sectors': metadata['sectors'],
+        'high_water_mark': datetime.fromisoformat(high_water_mark) if high_water_mark else None,
+        'created_at': metadata['created_at'],
+    }
+
+
+class SnapshotManager:
+    """Persist the screener to a memory-mapped snapshot and warm-start from it
+
+    On restore the snapshot is mapped, then only Stocks with `updated_at`
+    past the high-water mark (less a margin for clock skew and late
+    delivery) are replayed from Mongo. `updated_at` cannot reveal deletes:
+    while running the invalidation bus removes deleted rows, and a count
+    mismatch after restore triggers a background full reload.
+    """
+
+    def __init__(self, screener: StockScreener = stock_screener, path: str = None, interval: float = None):
+        self.screener = screener
+        self.path = path or settings.SNAPSHOT_PATH
+        self.interval = interval or settings.SNAPSHOT_INTERVAL
+        self.last_restore: Optional[dict] = None
+        self.last_write: Optional[dict] = None
+        self.write_failures = 0
+        self._task: Optional[asyncio.Task] = None
+        self._reload_task: Optional[asyncio.Task] = None
+
+    def _replay(self) -> int:
+        since = self.screener.high_water_mark
+        query = Stock.objects
+        if since is not None:
+            query = query.filter(updated_at__gte=since - timedelta(seconds=settings.SNAPSHOT_REPLAY_MARGIN))
+        projection = ('symbol', 'name', 'sector', 'updated_at') + StockScreener.NUMERIC_FIELDS
+        replayed = 0
+        for doc in query.only(*projection).as_pymongo():
+            self.screener.apply_document(doc)
+            replayed += 1
+        return replayed
+
+    def restore_sync(self) -> bool:
+        """Load the snapshot and catch up; returns False when there is none"""
+        started = time.perf_counter()
+        state = read_snapshot(self.path)
+        if state is None:
+            return False
+        mapped_ms = (time.perf_counter() - started) * 1000
+        self.screener.restore(state)
+        replayed = self._replay()
+        stored = Stock._get_collection().estimated_document_count()
+        self.last_restore = {
+            'at': datetime.utcnow(),
+            'snapshot_created_at': state['created_at'],
+            'rows': len(state['symbols']),
+            'replayed': replayed,
+            'stale': stored != len(self.screener),
+            'map_ms': mapped_ms,
+            'total_ms': (time.perf_counter() - started) * 1000,
+        }
+        return True
+
+    async def restore(self) -> bool:
+        try:
+            restored = await asyncio.to_thread(self.restore_sync)
+        except Exception as e:
+            print(f"Snapshot restore failed, screener will load from Mongo: {e}")
+            self.screener.invalidate()
+            return False
+        if restored:
+            print(
+                f"Restored {self.last_restore['rows']} screener rows from {self.path}, "
+                f"replayed {self.last_restore['replayed']} changes in {self.last_restore['total_ms']:.0f}ms"
+            )
+            if self.last_restore['stale']:
+                # Deletes since the snapshot; keep serving while a full load runs
+                print("Snapshot row count differs from stocks, reloading in the background")
+                self._reload_task = asyncio.create_task(asyncio.to_thread(self.screener.load))
+        return restored
+
+    def persist_sync(self) -> dict:
+        state = self.screener.export()
+        write_snapshot(state, self.path)
+        return state
+
+    async def persist(self) -> bool:
+        """Write the current screener state without blocking the event loop"""
+        if not self.screener.loaded:
+            return False
+        started = time.perf_counter()
+        state = await asyncio.to_thread(self.persist_sync)
+        self.last_write = {
+            'at': datetime.utcnow(),
+            'rows': len(state['symbols']),
+            'high_water_mark': state['high_water_mark'],
+            'elapsed_ms': (time.perf_counter() - started) * 1000,
+        }
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._reload_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        try:
+            await self.persist()
+        except Exception as e:
+            print(f"Snapshot write on shutdown failed: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.persist()
+            except Exception as e:
+                self.write_failures += 1
+                print(f"Snapshot write failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'last_restore': self.last_restore,
+            'last_write': self.last_write,
+            'write_failures': self.write_failures,
+        }
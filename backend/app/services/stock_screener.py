@@ -0,0 +1,312 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.stock import Stock
+
+
+class StockScreener:
+    """Columnar in-memory snapshot of Stock fields for vectorized screening"""
+
+    NUMERIC_FIELDS = ('price', 'change_percent', 'volume', 'market_cap')
+    SORT_FIELDS = NUMERIC_FIELDS + ('symbol',)
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Latest Stock.updated_at reflected in the snapshot, for incremental catch-up
+        self.high_water_mark: Optional[datetime] = None
+        self._allocate(self.INITIAL_CAPACITY)
+
+    def _allocate(self, capacity: int):
+        """Reset the snapshot to empty columns of the given capacity"""
+        self._size = 0
+        self._free_rows: List[int] = []
+        self._rows: Dict[str, int] = {}
+        self._symbol_by_id: Dict[str, str] = {}
+        self._symbols = np.empty(capacity, dtype=object)
+        self._ids = np.empty(capacity, dtype=object)
+        self._names = np.empty(capacity, dtype=object)
+        self._columns = {
+            field: np.full(capacity, np.nan, dtype=np.float64)
+            for field in self.NUMERIC_FIELDS
+        }
+        # Sectors are stored as categorical codes into self._sectors
+        self._sector_codes = np.full(capacity, -1, dtype=np.int32)
+        self._sectors: List[str] = []
+        self._sector_index: Dict[str, int] = {}
+        self._alive = np.zeros(capacity, dtype=bool)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _grow(self, min_capacity: int):
+        """Grow all columns geometrically so appends stay amortized O(1)"""
+        capacity = len(self._alive)
+        if min_capacity <= capacity:
+            return
+        new_capacity = max(min_capacity, capacity * 2)
+        extra = new_capacity - capacity
+        self._symbols = np.concatenate([self._symbols, np.empty(extra, dtype=object)])
+        self._ids = np.concatenate([self._ids, np.empty(extra, dtype=object)])
+        self._names = np.concatenate([self._names, np.empty(extra, dtype=object)])
+        for field, column in self._columns.items():
+            self._columns[field] = np.concatenate([column, np.full(extra, np.nan)])
+        self._sector_codes = np.concatenate([self._sector_codes, np.full(extra, -1, dtype=np.int32)])
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+
+    def _sector_code(self, sector: Optional[str]) -> int:
+        if not sector:
+            return -1
+        code = self._sector_index.get(sector)
+        if code is None:
+            code = len(self._sectors)
+            self._sectors.append(sector)
+            self._sector_index[sector] = code
+        return code
+
+    def _set_row(self, row: int, doc: dict):
+        self._symbols[row] = doc['symbol']
+        self._names[row] = doc.get('name')
+        for field, column in self._columns.items():
+            value = doc.get(field)
+            column[row] = np.nan if value is None else value
+        self._sector_codes[row] = self._sector_code(doc.get('sector'))
+        self._alive[row] = True
+        stock_id = doc.get('_id', doc.get('id'))
+        if stock_id is not None:
+            previous = self._ids[row]
+            if previous is not None and previous != str(stock_id) and self._symbol_by_id.get(previous) == doc['symbol']:
+                # The symbol now belongs to another Stock
+                del self._symbol_by_id[previous]
+            self._ids[row] = str(stock_id)
+            self._symbol_by_id[str(stock_id)] = doc['symbol']
+        updated_at = doc.get('updated_at')
+        if updated_at is not None and (self.high_water_mark is None or updated_at > self.high_water_mark):
+            self.high_water_mark = updated_at
+
+    def load(self):
+        """Rebuild the snapshot with a single scan of the stocks collection"""
+        projection = ('symbol', 'name', 'sector', 'updated_at') + self.NUMERIC_FIELDS
+        docs = list(Stock.objects.only(*projection).as_pymongo())
+        with self._lock:
+            self.high_water_mark = None
+            self._allocate(max(self.INITIAL_CAPACITY, len(docs)))
+            for row, doc in enumerate(docs):
+                self._set_row(row, doc)
+                self._rows[doc['symbol']] = row
+            self._size = len(docs)
+            self._loaded = True
+
+    def invalidate(self):
+        """Force a full reload on the next screen"""
+        self._loaded = False
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def upsert(self, stock):
+        """Insert or update a single row from a Stock document or dict"""
+        doc = stock if isinstance(stock, dict) else {
+            'id': stock.id,
+            'symbol': stock.symbol,
+            'name': stock.name,
+            'sector': stock.sector,
+            'updated_at': stock.updated_at,
+            **{field: getattr(stock, field) for field in self.NUMERIC_FIELDS},
+        }
+        with self._lock:
+            row = self._rows.get(doc['symbol'])
+            if row is None:
+                if self._free_rows:
+                    row = self._free_rows.pop()
+                else:
+                    row = self._size
+                    self._grow(row + 1)
+                    self._size += 1
+                self._rows[doc['symbol']] = row
+            else:
+                # Partial updates only touch the fields that were provided
+                doc = {**self._row_to_dict(row), **doc}
+            self._set_row(row, doc)
+
+    def remove(self, symbol: str):
+        """Drop a symbol from the snapshot"""
+        with self._lock:
+            row = self._rows.pop(symbol, None)
+            if row is None:
+                return
+            self._alive[row] = False
+            stock_id = self._ids[row]
+            if stock_id is not None and self._symbol_by_id.get(stock_id) == symbol:
+                del self._symbol_by_id[stock_id]
+            self._symbols[row] = None
+            self._ids[row] = None
+            self._names[row] = None
+            self._free_rows.append(row)
+
+    def remove_by_id(self, stock_id) -> None:
+        """Drop a row by Stock id, for deletes that only carry the id"""
+        with self._lock:
+            symbol = self._symbol_by_id.pop(str(stock_id), None)
+            if symbol is not None and symbol in self._rows:
+                self.remove(symbol)
+
+    def handle_invalidation(self, event):
+        """Apply a stocks change published on the invalidation bus"""
+        if event.operation == 'reset':
+            self.invalidate()
+        elif event.operation == 'delete' or event.document is None:
+            self.remove_by_id(event.document_id)
+        else:
+            self.apply_document(event.document)
+
+    def apply_document(self, doc: dict):
+        """Upsert a full Stock document, dropping the old row if its symbol changed"""
+        with self._lock:
+            previous = self._symbol_by_id.get(str(doc['_id']))
+            if previous is not None and previous != doc['symbol']:
+                self.remove(previous)
+            self.upsert(doc)
+
+    def export(self) -> dict:
+        """Compact copy of the live rows, for persisting a snapshot"""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            return {
+                'symbols': self._symbols[rows],
+                'names': self._names[rows],
+                'ids': self._ids[rows].tolist(),
+                'columns': {field: column[rows] for field, column in self._columns.items()},
+                'sector_codes': self._sector_codes[rows],
+                'sectors': list(self._sectors),
+                'high_water_mark': self.high_water_mark,
+            }
+
+    def restore(self, state: dict):
+        """Adopt exported state; numeric columns are used as given, without copying"""
+        symbols = list(state['symbols'])
+        size = len(symbols)
+        with self._lock:
+            self._size = size
+            self._free_rows = []
+            self._rows = {symbol: row for row, symbol in enumerate(symbols)}
+            self._symbol_by_id = {
+                stock_id: symbol for stock_id, symbol in zip(state['ids'], symbols) if stock_id
+            }
+            self._symbols = np.array(symbols, dtype=object)
+            self._ids = np.array([stock_id or None for stock_id in state['ids']], dtype=object)
+            self._names = np.array(list(state['names']), dtype=object)
+            self._columns = {field: state['columns'][field] for field in self.NUMERIC_FIELDS}
+            self._sector_codes = state['sector_codes']
+            self._sectors = list(state['sectors'])
+            self._sector_index = {sector: code for code, sector in enumerate(self._sectors)}
+            self._alive = np.ones(size, dtype=bool)
+            self.high_water_mark = state['high_water_mark']
+            self._loaded = True
+
+    def lookup(self, symbols: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Return price and sector-code columns aligned to `symbols`
+
+        Unknown symbols get a NaN price and sector code -1. Sector codes
+        index into the returned list of sector names.
+        """
+        with self._lock:
+            rows = np.fromiter(
+                (self._rows.get(symbol, -1) for symbol in symbols),
+                dtype=np.int64,
+                count=len(symbols)
+            )
+            known = rows >= 0
+            prices = np.full(len(rows), np.nan)
+            prices[known] = self._columns['price'][rows[known]]
+            codes = np.full(len(rows), -1, dtype=np.int32)
+            codes[known] = self._sector_codes[rows[known]]
+            return prices, codes, list(self._sectors)
+
+    def _row_to_dict(self, row: int) -> dict:
+        code = self._sector_codes[row]
+        result = {
+            'symbol': self._symbols[row],
+            'name': self._names[row],
+            'sector': self._sectors[code] if code >= 0 else None,
+        }
+        for field, column in self._columns.items():
+            value = column[row]
+            if np.isnan(value):
+                result[field] = None
+            elif field == 'volume':
+                result[field] = int(value)
+            else:
+                result[field] = float(value)
+        return result
+
+    def screen(
+        self,
+        sectors: Optional[Sequence[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        sort_by: str = 'market_cap',
+        descending: bool = True,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> Tuple[int, List[dict]]:
+        """Evaluate a compound filter and sort with boolean masks over the columns"""
+        if sort_by not in self.SORT_FIELDS:
+            raise ValueError(f"Cannot sort by '{sort_by}'")
+        ranges = ranges or {}
+        for field in ranges:
+            if field not in self._columns:
+                raise ValueError(f"Cannot filter on '{field}'")
+
+        with self._lock:
+            n = self._size
+            mask = self._alive[:n].copy()
+
+            if sectors:
+                codes = [self._sector_index[s] for s in sectors if s in self._sector_index]
+                mask &= np.isin(self._sector_codes[:n], codes)
+
+            # NaN compares False, so rows missing a filtered field drop out
+            for field, (low, high) in ranges.items():
+                column = self._columns[field][:n]
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+
+            indices = np.flatnonzero(mask)
+            total = len(indices)
+            end = min(skip + limit, total)
+            if skip >= end:
+                return total, []
+
+            if sort_by == 'symbol':
+                keys = self._symbols[indices].astype(str)
+                order = np.argsort(keys, kind='stable')
+                if descending:
+                    order = order[::-1]
+                page = indices[order[skip:end]]
+            else:
+                # Missing values always sort last
+                keys = self._columns[sort_by][indices]
+                keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+                if end < total:
+                    # Only the first `end` rows need a full sort
+                    top = np.argpartition(keys, end - 1)[:end]
+                    order = top[np.argsort(keys[top], kind='stable')]
+                else:
+                    order = np.argsort(keys, kind='stable')
+                page = indices[order[skip:end]]
+
+            return total, [self._row_to_dict(row) for row in page]
+
+
+stock_screener = StockScreener()
@@ -1,6 +1,21 @@
-from typing import List, Optional
-from app.schemas.stock import StockCreate, StockUpdate, StockResponse
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from app.schemas.stock import (
+    StockCreate,
+    StockUpdate,
+    StockResponse,
+    StockScreenResponse,
+    StockScreenResult
+)
 from app.models.stock import Stock
+from app.models.price_bar import PriceBar
+from datetime import datetime
+from pymongo import UpdateOne
+from app.services.stock_screener import stock_screener
+from app.services.bar_aggregator import bar_aggregator
+from app.services.write_buffer import PRICE_FIELDS, price_write_buffer
+from app.core.config import settings
+from app.utils.singleflight import SingleFlight
 from mongoengine.errors import DoesNotExist, ValidationError
 
 
@@ -20,6 +35,11 @@ class StockService:
         {"symbol": "WMT", "name": "Walmart Inc."}
     ]
     
+    # Coalesce concurrent identical lookups into one backend query
+    _get_stock_flight = SingleFlight('StockService.get_stock')
+    _get_stock_by_symbol_flight = SingleFlight('StockService.get_stock_by_symbol')
+    _get_stocks_flight = SingleFlight('StockService.get_stocks')
+    
     def __init__(self):
         self.predefined_companies = self.get_predefined_companies()
         # self.predefined_companies_db = self.get_predefined_companies_db()
@@ -39,6 +59,8 @@ class StockService:
             stock_dict = stock_data.model_dump()
             db_stock = Stock(**stock_dict)
             db_stock.save()
+            stock_screener.upsert(db_stock)
+            bar_aggregator.add_tick(db_stock.symbol, db_stock.price, db_stock.volume)
             
             # Convert back to response format
             return StockResponse(
@@ -57,55 +79,57 @@ class StockService:
             raise ValueError(f"Validation error: {e}")
     
     async def get_stock(self, stock_id: str) -> Optional[StockResponse]:
-        """Get a Stock by ID"""
+        """Get a Stock by ID; concurrent lookups of one ID share a query"""
+        cached = price_write_buffer.cached(str(stock_id))
+        if cached is not None:
+            return cached
+        return price_write_buffer.overlay(await self._get_stock_flight.do(
+            str(stock_id), asyncio.to_thread, self._load_stock, stock_id
+        ))
+    
+    def _load_stock(self, stock_id: str) -> Optional[StockResponse]:
         try:
-            db_stock = Stock.objects.get(id=stock_id)
-            return StockResponse(
-                id=str(db_stock.id),
-                symbol=db_stock.symbol,
-                name=db_stock.name,
-                price=db_stock.price,
-                change_percent=db_stock.change_percent,
-                volume=db_stock.volume,
-                market_cap=db_stock.market_cap,
-                sector=db_stock.sector,
-                created_at=db_stock.created_at,
-                updated_at=db_stock.updated_at
-            )
+            return self._stock_to_response(Stock.objects.get(id=stock_id))
         except DoesNotExist:
             return None
     
     async def get_stocks(self, skip: int = 0, limit: int = 100) -> List[StockResponse]:
-        """Get all Stocks with pagination"""
+        """Get all Stocks with pagination; concurrent identical pages share a query"""
+        stocks = await self._get_stocks_flight.do(
+            (skip, limit), asyncio.to_thread, self._load_stocks, skip, limit
+        )
+        # overlay() is a no-op when nothing is pending or in flight
+        return [price_write_buffer.overlay(stock) for stock in stocks]
+    
+    def _load_stocks(self, skip: int, limit: int) -> List[StockResponse]:
         db_stocks = Stock.objects.skip(skip).limit(limit).order_by('-created_at')
-        
-        return [
-            StockResponse(
-                id=str(stock.id),
-                symbol=stock.symbol,
-                name=stock.name,
-                price=stock.price,
-                change_percent=stock.change_percent,
-                volume=stock.volume,
-                market_cap=stock.market_cap,
-                sector=stock.sector,
-                created_at=stock.created_at,
-                updated_at=stock.updated_at
-            )
-            for stock in db_stocks
-        ]
+        return [self._stock_to_response(stock) for stock in db_stocks]
     
     async def update_stock(self, stock_id: str, stock_data: StockUpdate) -> Optional[StockResponse]:
         """Update a Stock"""
+        update_data = stock_data.model_dump(exclude_unset=True)
+        if settings.WRITE_BEHIND_ENABLED and self._is_price_update(update_data):
+            return await self._buffer_price_update(stock_id, update_data)
         try:
             db_stock = Stock.objects.get(id=stock_id)
+            previous_symbol = db_stock.symbol
+            
+            # Buffered price writes go out with this save instead of after it
+            buffered = await price_write_buffer.pop(previous_symbol, str(db_stock.id)) or {}
+            for field, value in buffered.items():
+                if field != 'updated_at':
+                    setattr(db_stock, field, value)
             
             # Update only provided fields
-            update_data = stock_data.model_dump(exclude_unset=True)
             for field, value in update_data.items():
                 setattr(db_stock, field, value)
             
             db_stock.save()
+            if db_stock.symbol != previous_symbol:
+                stock_screener.remove(previous_symbol)
+            stock_screener.upsert(db_stock)
+            if 'price' in update_data or 'volume' in update_data:
+                bar_aggregator.add_tick(db_stock.symbol, db_stock.price, db_stock.volume)
             
             return StockResponse(
                 id=str(db_stock.id),
@@ -124,30 +148,200 @@ class StockService:
         except ValidationError as e:
             raise ValueError(f"Validation error: {e}")
     
+    @staticmethod
+    def _is_price_update(update_data: dict) -> bool:
+        """Whether an update only sets valid write-behind price fields"""
+        return bool(update_data) and all(
+            field in PRICE_FIELDS and value is not None and (field == 'change_percent' or value >= 0)
+            for field, value in update_data.items()
+        )
+    
+    async def _buffer_price_update(self, stock_id: str, update_data: dict) -> Optional[StockResponse]:
+        """Apply a price-only update through the write-behind buffer"""
+        base = await self.get_stock(stock_id)
+        if base is None:
+            return None
+        price_write_buffer.put(base.symbol, {**update_data, 'updated_at': datetime.utcnow()}, base=base)
+        stock_screener.upsert({'symbol': base.symbol, **update_data})
+        updated = price_write_buffer.overlay(base)
+        if 'price' in update_data or 'volume' in update_data:
+            bar_aggregator.add_tick(updated.symbol, updated.price, updated.volume)
+        return updated
+    
     async def delete_stock(self, stock_id: str) -> bool:
         """Delete a Stock"""
         try:
             db_stock = Stock.objects.get(id=stock_id)
+            # Before the delete, so no buffered upsert can recreate the Stock
+            await price_write_buffer.pop(db_stock.symbol, str(db_stock.id))
             db_stock.delete()
+            stock_screener.remove(db_stock.symbol)
             return True
         except DoesNotExist:
             return False
     
     async def get_stock_by_symbol(self, symbol: str) -> Optional[StockResponse]:
-        """Get a Stock by symbol"""
+        """Get a Stock by symbol; concurrent lookups of one symbol share a query"""
+        return price_write_buffer.overlay(await self._get_stock_by_symbol_flight.do(
+            symbol.upper(), asyncio.to_thread, self._load_stock_by_symbol, symbol.upper()
+        ))
+    
+    def _load_stock_by_symbol(self, symbol: str) -> Optional[StockResponse]:
         try:
-            db_stock = Stock.objects.get(symbol=symbol.upper())
-            return StockResponse(
-                id=str(db_stock.id),
-                symbol=db_stock.symbol,
-                name=db_stock.name,
-                price=db_stock.price,
-                change_percent=db_stock.change_percent,
-                volume=db_stock.volume,
-                market_cap=db_stock.market_cap,
-                sector=db_stock.sector,
-                created_at=db_stock.created_at,
-                updated_at=db_stock.updated_at
-            )
+            return self._stock_to_response(Stock.objects.get(symbol=symbol))
         except DoesNotExist:
             return None
+    
+    async def get_stock_columns(self, skip: int = 0, limit: int = 100) -> Dict[str, list]:
+        """Get a page of Stocks as columns, straight from raw cursor documents
+
+        Used by binary encoders; skips per-row StockResponse construction.
+        """
+        fields = [field for field in StockResponse.model_fields if field != 'id']
+        columns: Dict[str, list] = {'id': [], **{field: [] for field in fields}}
+        docs = await asyncio.to_thread(self._load_stock_documents, fields, skip, limit)
+        # Overlay on the loop, where the write buffer's state lives
+        for doc in docs:
+            columns['id'].append(str(doc['_id']))
+            buffered = price_write_buffer.pending_fields(doc['symbol']) or {}
+            for field in fields:
+                columns[field].append(buffered.get(field, doc.get(field)))
+        return columns
+    
+    @staticmethod
+    def _load_stock_documents(fields: List[str], skip: int, limit: int) -> List[dict]:
+        cursor = Stock.objects.skip(skip).limit(limit).order_by('-created_at').only(*fields).as_pymongo()
+        return list(cursor)
+
+    async def get_price_bar_columns(
+        self,
+        symbol: str,
+        interval: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 1000
+    ) -> Dict[str, list]:
+        """Get stored OHLCV bars for a symbol as columns, oldest first"""
+        query = {'symbol': symbol.upper(), 'interval': interval}
+        if start or end:
+            query['ts'] = {}
+            if start:
+                query['ts']['$gte'] = start
+            if end:
+                query['ts']['$lt'] = end
+        fields = ['ts', 'open', 'high', 'low', 'close', 'volume']
+        cursor = PriceBar._get_collection().find(
+            query, {'_id': 0, **{field: 1 for field in fields}}
+        ).sort('ts', -1).limit(limit)
+        docs = list(cursor)[::-1]
+        return {field: [doc.get(field) for doc in docs] for field in fields}
+    
+    def _stock_to_response(self, db_stock: Stock) -> StockResponse:
+        """Convert MongoEngine Stock to StockResponse"""
+        return StockResponse(
+            id=str(db_stock.id),
+            symbol=db_stock.symbol,
+            name=db_stock.name,
+            price=db_stock.price,
+            change_percent=db_stock.change_percent,
+            volume=db_stock.volume,
+            market_cap=db_stock.market_cap,
+            sector=db_stock.sector,
+            created_at=db_stock.created_at,
+            updated_at=db_stock.updated_at
+        )
+    
+    async def apply_quotes(self, quotes: Dict[str, dict], aggregate: bool = True) -> int:
+        """Write a batch of refreshed quotes in one unordered bulk write
+
+        Symbols that have no Stock yet are inserted, so quotes for
+        predefined companies populate the collection on first refresh.
+        With WRITE_BEHIND_ENABLED the quotes are buffered instead.
+
+        Quotes feed the bar aggregator unless `aggregate` is False; an
+        optional epoch-seconds `ts` on a quote is used as its tick time
+        instead of the wall clock.
+        """
+        if not quotes:
+            return 0
+        now = datetime.utcnow()
+        requests = []
+        updates = []
+        for symbol, quote in quotes.items():
+            fields = {
+                field: quote[field]
+                for field in ('price', 'change_percent', 'volume')
+                if quote.get(field) is not None
+            }
+            updates.append((symbol, fields, quote.get('ts')))
+            # Static attributes, when the source provides them, only seed new Stocks
+            static = {field: quote[field] for field in ('sector', 'market_cap') if quote.get(field) is not None}
+            if settings.WRITE_BEHIND_ENABLED:
+                price_write_buffer.put(
+                    symbol,
+                    {**fields, 'updated_at': now},
+                    insert={**static, 'name': quote.get('name') or symbol, 'created_at': now}
+                )
+            else:
+                requests.append(UpdateOne(
+                    {'symbol': symbol},
+                    {
+                        '$set': {**fields, 'updated_at': now},
+                        '$setOnInsert': {**static, 'name': quote.get('name') or symbol, 'created_at': now}
+                    },
+                    upsert=True
+                ))
+        if requests:
+            await asyncio.to_thread(Stock._get_collection().bulk_write, requests, ordered=False)
+        # Only serve prices that were persisted (or accepted by the write buffer)
+        for symbol, fields, ts in updates:
+            stock_screener.upsert({'symbol': symbol, **fields})
+            if aggregate and 'price' in fields:
+                bar_aggregator.add_tick(symbol, fields['price'], fields.get('volume'), ts=ts)
+        return len(quotes)
+    
+    async def screen_stocks(
+        self,
+        sectors: Optional[List[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        sort_by: str = 'market_cap',
+        descending: bool = True,
+        skip: int = 0,
+        limit: int = 100
+    ) -> StockScreenResponse:
+        """Screen Stocks against the in-memory columnar snapshot"""
+        stock_screener.ensure_loaded()
+        total, rows = stock_screener.screen(
+            sectors=sectors,
+            ranges=ranges,
+            sort_by=sort_by,
+            descending=descending,
+            skip=skip,
+            limit=limit
+        )
+        return StockScreenResponse(
+            total=total,
+            results=[StockScreenResult(**row) for row in rows]
+        )
+
+    async def screen_stock_columns(
+        self,
+        sectors: Optional[List[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        sort_by: str = "market_cap",
+        descending: bool = True,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[int, Dict[str, list]]:
+        """Screen Stocks and return the total plus the page as columns for binary encoders"""
+        stock_screener.ensure_loaded()
+        total, rows = stock_screener.screen(
+            sectors=sectors,
+            ranges=ranges,
+            sort_by=sort_by,
+            descending=descending,
+            skip=skip,
+            limit=limit
+        )
+        columns = {field: [row[field] for row in rows] for field in StockScreenResult.model_fields}
+        return total, columns
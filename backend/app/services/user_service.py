@@ -1,3 +1,4 @@
+import asyncio
 from typing import List, Optional
 from app.schemas.user import (
     UserCreate,
@@ -13,11 +14,15 @@ from mongoengine.errors import (
     NotUniqueError
 )
 from datetime import datetime
+from app.utils.singleflight import SingleFlight
+from app.services.profile_cache import profile_cache
 
 
 class UserService:
     """Service layer for User operations using MongoEngine"""
     
+    _get_user_flight = SingleFlight('UserService.get_user')
+    
     def __init__(self):
         pass
     
@@ -48,13 +53,25 @@ class UserService:
             raise ValueError(f"Validation error: {e}")
     
     async def get_user(self, user_id: str) -> Optional[UserResponse]:
-        """Get a User by ID"""
+        """Get a User by ID; concurrent lookups of one ID share a query"""
+        return await self._get_user_flight.do(
+            str(user_id), asyncio.to_thread, self._load_user, user_id
+        )
+    
+    def _load_user(self, user_id: str) -> Optional[UserResponse]:
         try:
             db_user = User.objects.get(id=user_id)
             return self._user_to_response(db_user)
         except DoesNotExist:
             return None
     
+    async def get_profile(self, user_id: str, min_version: int = 0) -> Optional[UserResponse]:
+        """Get a User from the profile cache if at least `min_version`, else from Mongo"""
+        user = profile_cache.get(str(user_id), min_version)
+        if user is None:
+            user = await self.get_user(user_id)
+        return user
+    
     async def get_user_by_email(self, email: str) -> Optional[UserResponse]:
         """Get a User by email"""
         try:
@@ -100,6 +117,7 @@ class UserService:
         try:
             db_user = User.objects.get(id=user_id)
             db_user.delete()
+            profile_cache.invalidate(str(user_id))
             return True
         except DoesNotExist:
             return False
@@ -171,8 +189,8 @@ class UserService:
             return None
     
     def _user_to_response(self, db_user: User) -> UserResponse:
-        """Convert MongoEngine User to UserResponse"""
-        return UserResponse(
+        """Convert MongoEngine User to UserResponse and refresh the profile cache"""
+        user = UserResponse(
             id=str(db_user.id),
             email=db_user.email,
             name=db_user.name,
@@ -183,5 +201,8 @@ class UserService:
             updated_at=db_user.updated_at,
             last_login=db_user.last_login,
             watchlist=db_user.watchlist,
-            preferred_sectors=db_user.preferred_sectors
+            preferred_sectors=db_user.preferred_sectors,
+            profile_version=db_user.profile_version or 0
         )
+        profile_cache.put(user)
+        return user
@@ -0,0 +1,188 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.models.stock import Stock
+from app.schemas.stock import StockResponse
+
+
+# Stock fields that may be written behind; updated_at is stamped alongside
+PRICE_FIELDS = ('price', 'change_percent', 'volume')
+
+
+class PriceWriteBuffer:
+    """Write-behind buffer for high-frequency Stock price fields
+
+    Only the latest price, change_percent, volume and updated_at per symbol
+    are kept, and written as one unordered bulk write every flush interval
+    or once `max_pending` symbols are dirty, so Mongo write load scales with
+    symbols x flush rate rather than tick rate. Reads in this process
+    overlay buffered values; other workers see them after the next flush.
+
+    Buffer state is only touched on the event loop; flush threads do I/O only.
+    """
+
+    def __init__(self, flush_interval: float = None, max_pending: int = None):
+        self.flush_interval = flush_interval or settings.WRITE_BEHIND_FLUSH_INTERVAL
+        self.max_pending = max_pending or settings.WRITE_BEHIND_MAX_PENDING
+        self.buffered = 0
+        self.flushed = 0
+        self.failures = 0
+        # symbol -> ($set fields, $setOnInsert fields or None when the Stock must already exist)
+        self._pending: Dict[str, Tuple[dict, Optional[dict]]] = {}
+        # Batch being written; still overlaid so reads never go back in time mid-flush
+        self._inflight: Dict[str, Tuple[dict, Optional[dict]]] = {}
+        # Last full response per buffered stock id, so updates skip the read
+        self._bases: Dict[str, StockResponse] = {}
+        self._wakeup = asyncio.Event()
+        # Write of the in-flight batch, for callers that must not race it
+        self._flushing: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(self, symbol: str, fields: dict, insert: Optional[dict] = None, base: Optional[StockResponse] = None):
+        """Buffer the latest price fields for a symbol; `insert` upserts missing Stocks"""
+        previous = self._pending.get(symbol)
+        if previous is not None:
+            fields = {**previous[0], **fields}
+            insert = insert or previous[1]
+        self._pending[symbol] = (fields, insert)
+        if base is not None:
+            self._bases[base.id] = base
+        self.buffered += 1
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    def pending_fields(self, symbol: str) -> Optional[dict]:
+        entry = self._pending.get(symbol)
+        inflight = self._inflight.get(symbol)
+        if inflight is None:
+            return entry[0] if entry is not None else None
+        return {**inflight[0], **entry[0]} if entry is not None else inflight[0]
+
+    async def pop(self, symbol: str, stock_id: Optional[str] = None) -> Optional[dict]:
+        """Take a symbol's buffered fields so a full-document write can include them
+
+        Waits out any in-flight write of the symbol first, so that write can
+        never land after, and overwrite, the caller's own. Fields it wrote
+        are returned as well, since the caller may have read the document
+        before they landed. Do not await between this and the write.
+        """
+        if stock_id is not None:
+            self._bases.pop(stock_id, None)
+        fields = {}
+        # A new flush may start before this coroutine resumes, hence the loop
+        while symbol in self._inflight and self._flushing is not None:
+            fields.update(self._inflight[symbol][0])
+            await asyncio.wait([self._flushing])
+        entry = self._pending.pop(symbol, None)
+        if entry is not None:
+            fields.update(entry[0])
+        return fields or None
+
+    def overlay(self, response: Optional[StockResponse]) -> Optional[StockResponse]:
+        """Apply buffered fields to a response read from the database"""
+        if response is None or not (self._pending or self._inflight):
+            return response
+        fields = self.pending_fields(response.symbol)
+        return response.model_copy(update=fields) if fields else response
+
+    def cached(self, stock_id: str) -> Optional[StockResponse]:
+        """Latest view of a buffered stock without a database read"""
+        base = self._bases.get(stock_id)
+        if base is None or base.symbol not in self._pending:
+            return None
+        return self.overlay(base)
+
+    def drain(self) -> Dict[str, Tuple[dict, Optional[dict]]]:
+        pending, self._pending = self._pending, {}
+        self._inflight = pending
+        self._bases.clear()
+        self._wakeup.clear()
+        return pending
+
+    def _requeue(self, pending: Dict[str, Tuple[dict, Optional[dict]]]):
+        # Anything buffered since the drain is newer and wins
+        for symbol, (fields, insert) in pending.items():
+            newer = self._pending.get(symbol)
+            if newer is not None:
+                fields, insert = {**fields, **newer[0]}, newer[1] or insert
+            self._pending[symbol] = (fields, insert)
+
+    def write(self, pending: Dict[str, Tuple[dict, Optional[dict]]]) -> int:
+        if not pending:
+            return 0
+        requests = []
+        for symbol, (fields, insert) in pending.items():
+            update = {'$set': fields}
+            if insert:
+                update['$setOnInsert'] = insert
+            requests.append(UpdateOne({'symbol': symbol}, update, upsert=insert is not None))
+        Stock._get_collection().bulk_write(requests, ordered=False)
+        self.flushed += len(requests)
+        return len(requests)
+
+    async def flush_async(self) -> int:
+        if not self._pending:
+            return 0
+        pending = self.drain()
+        self._flushing = asyncio.ensure_future(asyncio.to_thread(self.write, pending))
+        try:
+            return await asyncio.shield(self._flushing)
+        except Exception:
+            self.failures += 1
+            self._requeue(pending)
+            raise
+        finally:
+            self._inflight = {}
+            self._flushing = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, attempts: int = 3):
+        """Stop the flush loop and write everything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for attempt in range(attempts):
+            try:
+                await self.flush_async()
+                return
+            except Exception as e:
+                print(f"Price write flush on shutdown failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        print(f"Dropping {len(self._pending)} buffered price updates")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush_async()
+            except Exception as e:
+                print(f"Price write flush failed: {e}")
+                await asyncio.sleep(self.flush_interval)
+
+    def stats(self) -> dict:
+        return {
+            'enabled': settings.WRITE_BEHIND_ENABLED,
+            'pending': len(self._pending),
+            'buffered': self.buffered,
+            'flushed': self.flushed,
+            'failures': self.failures,
+        }
+
+
+price_write_buffer = PriceWriteBuffer()
@@ -0,0 +1,89 @@
+import io
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = {MSGPACK, "application/x-msgpack"}
+
+
+def available_media_types() -> List[str]:
+    """Binary media types whose encoder libraries are installed"""
+    media_types = []
+    if pa is not None:
+        media_types.append(ARROW_STREAM)
+    if msgpack is not None:
+        media_types.append(MSGPACK)
+    return media_types
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """Pick a binary media type from an Accept header, or None for JSON"""
+    if not accept:
+        return None
+    available = available_media_types()
+    candidates = []
+    for position, part in enumerate(accept.split(',')):
+        media_type, *params = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type in MSGPACK_ALIASES:
+            media_type = MSGPACK
+        if media_type in available and quality > 0:
+            candidates.append((-quality, position, media_type))
+        elif media_type in ('application/json', '*/*', 'application/*') and quality > 0:
+            candidates.append((-quality, position, None))
+    return min(candidates)[2] if candidates else None
+
+
+def _is_datetime_column(values: list) -> bool:
+    return isinstance(next((v for v in values if v is not None), None), datetime)
+
+
+def _epoch_millis(values: list) -> list:
+    return [
+        None if value is None
+        else int(value.replace(tzinfo=value.tzinfo or timezone.utc).timestamp() * 1000)
+        for value in values
+    ]
+
+
+def encode_columns(columns: Dict[str, list], media_type: str) -> bytes:
+    """Encode equal-length columns as one Arrow IPC stream batch or MessagePack map
+
+    Datetime columns become Arrow timestamps, or epoch milliseconds in
+    MessagePack.
+    """
+    if media_type == ARROW_STREAM:
+        batch = pa.RecordBatch.from_pydict(columns)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue()
+
+    if media_type == MSGPACK:
+        encoded = {
+            name: _epoch_millis(values) if _is_datetime_column(values) else values
+            for name, values in columns.items()
+        }
+        return msgpack.packb(encoded, use_bin_type=True)
+
+    raise ValueError(f"Unsupported media type '{media_type}'")
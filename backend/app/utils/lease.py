@@ -0,0 +1,40 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from mongoengine.connection import get_db
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+class MongoLease:
+    """Expiring named lease in the `leases` collection, held by one process at a time
+
+    For background work that every API worker starts but only one should
+    run. The holder renews well within `ttl`; if it dies, another process
+    takes over once the lease expires. Calls block, so run them off the loop.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self) -> bool:
+        """Take or renew the lease; False while another owner holds it"""
+        now = datetime.utcnow()
+        try:
+            get_db()['leases'].find_one_and_update(
+                {'_id': self.name, '$or': [{'owner': self.owner}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'owner': self.owner, 'expires_at': now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The lease exists, is unexpired and belongs to someone else
+            return False
+        return True
+
+    def release(self):
+        get_db()['leases'].delete_one({'_id': self.name, 'owner': self.owner})
@@ -0,0 +1,84 @@
+import asyncio
+import bisect
+import time
+from typing import List, Optional
+
+
+class LoopLagMonitor:
+    """Background sampler of event-loop lag
+
+    Sleeps for a fixed interval and records how late it woke up. Any
+    synchronous work hogging the loop shows up directly as lag. Samples
+    are also counted in a cumulative histogram of lag buckets.
+    """
+
+    SMOOTHING = 0.3
+    # Histogram bucket upper bounds in seconds; the last bucket is unbounded
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.lag = 0.0
+        self.smoothed_lag = 0.0
+        self.max_lag = 0.0
+        self.samples = 0
+        self.total_lag = 0.0
+        self.counts: List[int] = [0] * (len(self.BUCKETS) + 1)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, time.perf_counter() - started - self.interval))
+
+    def record(self, lag: float):
+        self.lag = lag
+        self.smoothed_lag += self.SMOOTHING * (lag - self.smoothed_lag)
+        self.max_lag = max(self.max_lag, lag)
+        self.samples += 1
+        self.total_lag += lag
+        self.counts[bisect.bisect_left(self.BUCKETS, lag)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile of lag samples"""
+        if not self.samples:
+            return 0.0
+        rank = q * self.samples
+        seen = 0
+        for bound, count in zip(self.BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_lag
+
+    def histogram(self) -> dict:
+        buckets = {f"le_{bound * 1000:g}ms": count for bound, count in zip(self.BUCKETS, self.counts)}
+        buckets[f"gt_{self.BUCKETS[-1] * 1000:g}ms"] = self.counts[-1]
+        return {
+            'interval': self.interval,
+            'samples': self.samples,
+            'lag': self.lag,
+            'smoothed_lag': self.smoothed_lag,
+            'mean_lag': self.total_lag / self.samples if self.samples else 0.0,
+            'max_lag': self.max_lag,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,152 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+from mongoengine.connection import get_db
+
+
+RANGE_OPERATORS = {'$gt', '$gte', '$lt', '$lte', '$ne', '$nin', '$exists', '$not'}
+PLACEHOLDER_ID = '000000000000000000000000'
+
+
+class QueryShape(NamedTuple):
+    """Canonical query issued by one service method"""
+    method: str
+    collection: str
+    filter: dict
+    sort: Optional[List[Tuple[str, int]]] = None
+    limit: int = 0
+    skip: int = 0
+    allow_collscan: bool = False  # full scans by design, e.g. snapshot loads
+
+
+def canonical_queries() -> List[QueryShape]:
+    """Query shapes of every service method that reads or writes MongoDB
+
+    tests/test_query_audit.py fails when a service method touches the
+    database without a shape listed here.
+    """
+    oid = ObjectId(PLACEHOLDER_ID)
+    return [
+        QueryShape('StockService.create_stock', 'stocks', {'symbol': 'AAPL'}),
+        QueryShape('StockService.get_stock', 'stocks', {'_id': oid}),
+        QueryShape('StockService.get_stocks', 'stocks', {}, [('created_at', -1)], limit=100, skip=100),
+        QueryShape('StockService.get_stock_columns', 'stocks', {}, [('created_at', -1)], limit=100, skip=100),
+        QueryShape('StockService.get_stock_by_symbol', 'stocks', {'symbol': 'AAPL'}),
+        QueryShape('StockService.update_stock', 'stocks', {'_id': oid}),
+        QueryShape('StockService.delete_stock', 'stocks', {'_id': oid}),
+        QueryShape('StockService.apply_quotes', 'stocks', {'symbol': 'AAPL'}),
+        QueryShape(
+            'StockService.get_price_bar_columns', 'price_bars',
+            {'symbol': 'AAPL', 'interval': '1m', 'ts': {'$gte': 0, '$lt': 1}}, [('ts', -1)], limit=1000
+        ),
+        QueryShape('PriceWriteBuffer.write', 'stocks', {'symbol': 'AAPL'}),
+        QueryShape('StockScreener.load', 'stocks', {}, allow_collscan=True),
+        QueryShape('SnapshotManager._replay', 'stocks', {'updated_at': {'$gte': 0}}),
+        QueryShape('ChangeStreamListener._poll', 'stocks', {'updated_at': {'$gte': 0}}, [('updated_at', 1)]),
+        QueryShape('ChangeStreamListener._poll', 'users', {'updated_at': {'$gte': 0}}, [('updated_at', 1)]),
+        QueryShape('UserService.create_user', 'users', {'email': 'user@example.com'}),
+        QueryShape('UserService.get_user', 'users', {'_id': oid}),
+        QueryShape('UserService.get_profile', 'users', {'_id': oid}),
+        QueryShape('UserService.get_user_by_email', 'users', {'email': 'user@example.com'}),
+        QueryShape('UserService.get_users', 'users', {}, [('created_at', -1)], limit=100, skip=100),
+        QueryShape('UserService.update_user', 'users', {'_id': oid}),
+        # Changing the email is checked against the unique email index
+        QueryShape('UserService.update_user', 'users', {'email': 'user@example.com'}),
+        QueryShape('UserService.delete_user', 'users', {'_id': oid}),
+        QueryShape('UserService.authenticate_user', 'users', {'email': 'user@example.com'}),
+        QueryShape('UserService.authenticate_user', 'users', {'_id': oid}),
+        QueryShape('UserService.update_watchlist', 'users', {'_id': oid}),
+        QueryShape('UserService.update_preferences', 'users', {'_id': oid}),
+        QueryShape('UserService.add_to_watchlist', 'users', {'_id': oid}),
+        QueryShape('UserService.remove_from_watchlist', 'users', {'_id': oid}),
+        QueryShape('QuoteRefreshScheduler._load_watchers', 'users', {}, allow_collscan=True),
+        QueryShape('MongoLease.acquire', 'leases', {'_id': 'quote-refresh'}),
+        QueryShape('MongoLease.release', 'leases', {'_id': 'quote-refresh', 'owner': 'host:1:0'}),
+        QueryShape('DigestService.load_quotes', 'stocks', {}, allow_collscan=True),
+        QueryShape(
+            'DigestService._user_batches', 'users',
+            {'is_active': True, 'watchlist.0': {'$exists': True}, 'last_digest_at': {'$not': {'$gte': 0}}},
+            allow_collscan=True
+        ),
+        QueryShape('DigestService._mark_sent', 'users', {'_id': {'$in': [oid]}}),
+        QueryShape('PortfolioService.get_portfolio', 'portfolios', {'user_id': PLACEHOLDER_ID}),
+        QueryShape('PortfolioService.add_lot', 'portfolios', {'user_id': PLACEHOLDER_ID}),
+        QueryShape('PortfolioService.remove_holding', 'portfolios', {'user_id': PLACEHOLDER_ID}),
+        QueryShape('PortfolioService._value_portfolio', 'stocks', {'symbol': {'$in': ['AAPL', 'MSFT']}}),
+        QueryShape('PortfolioService.revalue_all', 'portfolios', {}, allow_collscan=True),
+        QueryShape('PortfolioService._revalue_chunk', 'portfolios', {'_id': oid}),
+        QueryShape('RiskService._load_closes', 'price_bars', {'symbol': {'$in': ['AAPL', 'MSFT']}, 'interval': '1d', 'ts': {'$gte': 0}}),
+    ]
+
+
+def _stages(plan: dict):
+    """Yield every stage in an explain plan tree"""
+    yield plan
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get('inputStages', []):
+        yield from _stages(child)
+
+
+def recommend_index(shape: QueryShape) -> List[Tuple[str, int]]:
+    """Compound index following the equality, sort, range ordering"""
+    equality, ranges = [], []
+    for field, condition in shape.filter.items():
+        if field.startswith('$'):
+            continue
+        if isinstance(condition, dict) and RANGE_OPERATORS & condition.keys():
+            ranges.append((field, 1))
+        else:
+            equality.append((field, 1))
+    index = equality + list(shape.sort or [])
+    index += [item for item in ranges if item[0] not in {field for field, _ in index}]
+    return index
+
+
+def explain(shape: QueryShape) -> dict:
+    command = {'find': shape.collection, 'filter': shape.filter}
+    if shape.sort:
+        command['sort'] = dict(shape.sort)
+    if shape.limit:
+        command['limit'] = shape.limit
+    if shape.skip:
+        command['skip'] = shape.skip
+    return get_db().command('explain', command, verbosity='queryPlanner')
+
+
+def audit_query(shape: QueryShape) -> dict:
+    """Explain one query shape and flag collection scans and in-memory sorts"""
+    winning_plan = explain(shape)['queryPlanner']['winningPlan']
+    stages = [stage.get('stage') for stage in _stages(winning_plan)]
+    indexes = [stage['indexName'] for stage in _stages(winning_plan) if 'indexName' in stage]
+    issues = []
+    if 'COLLSCAN' in stages and not shape.allow_collscan:
+        issues.append('COLLSCAN')
+    if 'SORT' in stages:
+        issues.append('IN_MEMORY_SORT')
+    return {
+        'method': shape.method,
+        'collection': shape.collection,
+        'stages': stages,
+        'indexes': indexes,
+        'issues': issues,
+        'recommended_index': recommend_index(shape) if issues else None,
+    }
+
+
+def audit_queries(shapes: Optional[List[QueryShape]] = None) -> List[dict]:
+    """Audit every canonical query shape"""
+    return [audit_query(shape) for shape in (shapes or canonical_queries())]
+
+
+def report(results: List[dict]) -> int:
+    """Print audit findings; returns the number of flagged queries"""
+    flagged = [result for result in results if result['issues']]
+    for result in results:
+        status = ', '.join(result['issues']) or 'ok'
+        print(f"{result['method']:<40} {status:<24} {' > '.join(filter(None, result['stages']))}")
+    for result in flagged:
+        fields = ', '.join(f"{field}: {direction}" for field, direction in result['recommended_index'])
+        print(f"Recommend index on {result['collection']} {{{fields}}} for {result['method']}")
+    return len(flagged)
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight call
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task. Results and exceptions are delivered
+    to every waiter. Each waiter awaits through `asyncio.shield`, so
+    cancelling one caller never cancels the shared work for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        _groups.append(self)
+
+    @property
+    def saved(self) -> int:
+        """Number of calls answered by another caller's in-flight work"""
+        return self.calls - self.executions
+
+    async def _run(self, key: Hashable, fn: Callable[..., Awaitable], args: tuple) -> Any:
+        try:
+            return await fn(*args)
+        finally:
+            # Removed before the task completes, so later callers start fresh
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _consume_exception(task: asyncio.Task):
+        # Avoid "exception was never retrieved" when every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable], *args) -> Any:
+        """Run `fn(*args)` unless a call for `key` is already in flight"""
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(self._run(key, fn, args))
+            task.add_done_callback(self._consume_exception)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'saved': self.saved,
+            'in_flight': len(self._inflight),
+        }
+
+
+_groups: List[SingleFlight] = []
+
+
+def singleflight_stats() -> Dict[str, dict]:
+    """Counters for every SingleFlight group in the process"""
+    return {group.name: group.stats() for group in _groups}
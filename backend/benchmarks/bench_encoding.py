@@ -0,0 +1,85 @@
+"""Compare JSON, MessagePack and Arrow IPC for bulk stock payloads.
+
+Run from backend/: python -m benchmarks.bench_encoding [--rows N]
+
+JSON is measured the way GET /stocks/ serves it (StockResponse models
+dumped through FastAPI's JSON path); the binary formats encode the same
+rows as columns, as the content-negotiated path does.
+"""
+import argparse
+import io
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.schemas.stock import StockResponse
+from app.utils.encoding import ARROW_STREAM, MSGPACK, encode_columns, msgpack, pa
+
+
+SECTORS = ["Technology", "Healthcare", "Financials", "Energy", "Utilities", "Industrials"]
+
+
+def make_columns(rows: int) -> dict:
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    return {
+        "id": [f"{i:024x}" for i in range(rows)],
+        "symbol": [f"S{i:05d}" for i in range(rows)],
+        "name": [f"Company {i}" for i in range(rows)],
+        "price": [rng.uniform(1, 1000) for _ in range(rows)],
+        "change_percent": [rng.gauss(0, 2) for _ in range(rows)],
+        "volume": [rng.randint(0, 50_000_000) for _ in range(rows)],
+        "market_cap": [rng.uniform(1e8, 3e12) for _ in range(rows)],
+        "sector": [rng.choice(SECTORS) for _ in range(rows)],
+        "created_at": [now - timedelta(days=rng.randint(0, 3650)) for _ in range(rows)],
+        "updated_at": [now for _ in range(rows)],
+    }
+
+
+def timed(fn, repeat: int = 5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    columns = make_columns(args.rows)
+    names = list(columns)
+    rows = [dict(zip(names, values)) for values in zip(*columns.values())]
+
+    def encode_json():
+        models = [StockResponse(**row) for row in rows]
+        return json.dumps([model.model_dump(mode="json") for model in models]).encode()
+
+    results = []
+    encode_time, payload = timed(encode_json)
+    decode_time, _ = timed(lambda: json.loads(payload))
+    results.append(("json", len(payload), encode_time, decode_time))
+
+    if msgpack is not None:
+        encode_time, payload = timed(lambda: encode_columns(columns, MSGPACK))
+        decode_time, _ = timed(lambda: msgpack.unpackb(payload, raw=False))
+        results.append(("msgpack", len(payload), encode_time, decode_time))
+
+    if pa is not None:
+        encode_time, payload = timed(lambda: encode_columns(columns, ARROW_STREAM))
+        decode_time, _ = timed(lambda: pa.ipc.open_stream(io.BytesIO(payload)).read_all())
+        results.append(("arrow", len(payload), encode_time, decode_time))
+
+    print(f"{args.rows} rows")
+    print(f"{'format':<10}{'bytes':>14}{'encode ms':>12}{'decode ms':>12}")
+    for name, size, encode_time, decode_time in results:
+        print(f"{name:<10}{size:>14,}{encode_time * 1000:>12.1f}{decode_time * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Measure simulated tick generation and how fast the bar aggregator ingests it.
+
+Run from backend/: python -m benchmarks.bench_simulator [--instruments N] [--steps N]
+
+Generation is fully vectorized; ingest feeds every tick through
+BarAggregator.add_tick with simulated timestamps, the per-tick path live
+quotes take, so the gap between the two shows the ingest headroom.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.bar_aggregator import BarAggregator
+from app.services.market_simulator import MarketSimulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instruments", type=int, default=5000)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--ingest-steps", type=int, default=100)
+    args = parser.parse_args()
+
+    simulator = MarketSimulator(instruments=args.instruments, seed=42)
+    started = time.perf_counter()
+    prices, volumes = simulator.simulate(args.steps)
+    elapsed = time.perf_counter() - started
+    print(f"generated {prices.size:,} ticks in {elapsed * 1000:.0f}ms ({prices.size / elapsed:,.0f} ticks/s)")
+
+    # The aggregator expects cumulative session volume, as quotes report it
+    prices, volumes = prices[:args.ingest_steps], np.cumsum(volumes[:args.ingest_steps], axis=0)
+    aggregator = BarAggregator(use_wall_clock=False)
+    symbols = simulator.symbols
+    start_ts = time.time()
+    started = time.perf_counter()
+    for step, (step_prices, step_volumes) in enumerate(zip(prices.tolist(), volumes.tolist())):
+        ts = start_ts + step * simulator.step_seconds
+        for symbol, price, volume in zip(symbols, step_prices, step_volumes):
+            aggregator.add_tick(symbol, price, volume, ts)
+    elapsed = time.perf_counter() - started
+    print(f"ingested {prices.size:,} ticks in {elapsed * 1000:.0f}ms ({prices.size / elapsed:,.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import math
+
+from pymongo.errors import BulkWriteError
+
+from app.services.bar_aggregator import CLOSE, HIGH, LOW, OPEN, VOLUME, BarAggregator
+
+
+def _aggregator() -> BarAggregator:
+    return BarAggregator(grace_seconds=5, flush_interval=60, max_pending=1000, use_wall_clock=False)
+
+
+def _closed_bars(aggregator: BarAggregator, interval: str = '1m') -> dict:
+    aggregator.advance(math.inf)
+    return {start: bar for _, name, start, bar in aggregator.drain() if name == interval}
+
+
+def test_in_order_ticks_count_volume_increase():
+    aggregator = _aggregator()
+    for ts, price, volume in ((120, 10.0, 1000), (125, 11.0, 1100), (130, 9.0, 1250)):
+        aggregator.add_tick('AAPL', price, volume, ts=ts)
+
+    bar = _closed_bars(aggregator)[120]
+    assert (bar[OPEN], bar[HIGH], bar[LOW], bar[CLOSE]) == (10.0, 11.0, 9.0, 9.0)
+    assert bar[VOLUME] == 250
+
+
+def test_late_tick_updates_prices_but_adds_no_volume():
+    aggregator = _aggregator()
+    for ts, price, volume in ((120, 10.0, 1000), (122, 10.5, 1100), (121, 12.0, 1050), (123, 11.0, 1200)):
+        aggregator.add_tick('AAPL', price, volume, ts=ts)
+
+    bar = _closed_bars(aggregator)[120]
+    assert bar[HIGH] == 12.0
+    assert bar[CLOSE] == 11.0
+    assert bar[VOLUME] == 200
+    assert aggregator.late_ticks == 0
+
+
+def test_session_reset_counts_new_day_volume_from_zero():
+    aggregator = _aggregator()
+    aggregator.add_tick('AAPL', 10.0, 4000, ts=86400 - 30)
+    aggregator.add_tick('AAPL', 10.0, 5000, ts=86400 - 20)
+    aggregator.add_tick('AAPL', 10.0, 300, ts=86400 + 10)
+
+    bars = _closed_bars(aggregator)
+    assert bars[86400 - 60][VOLUME] == 1000
+    assert bars[86400][VOLUME] == 300
+
+
+def test_partial_bulk_failure_requeues_only_failed_bars():
+    closed = [('AAPL', '1m', 60, [1.0] * 7), ('MSFT', '1m', 60, [2.0] * 7)]
+    error = BulkWriteError({'writeErrors': [{'index': 1, 'code': 11000}]})
+
+    assert BarAggregator._unwritten(closed, error) == [closed[1]]
+    assert BarAggregator._unwritten(closed, RuntimeError()) == closed
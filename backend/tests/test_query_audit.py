@@ -0,0 +1,80 @@
+import inspect
+import re
+
+from app.services.digest_service import DigestService
+from app.services.invalidation_bus import ChangeStreamListener
+from app.services.portfolio_service import PortfolioService
+from app.services.quote_scheduler import QuoteRefreshScheduler
+from app.services.risk_service import RiskService
+from app.services.snapshot import SnapshotManager
+from app.services.stock_screener import StockScreener
+from app.services.stock_service import StockService
+from app.services.user_service import UserService
+from app.services.write_buffer import PriceWriteBuffer
+from app.utils.lease import MongoLease
+from app.utils.query_audit import canonical_queries, recommend_index
+
+
+SERVICES = [
+    StockService, UserService, PortfolioService, RiskService, DigestService,
+    QuoteRefreshScheduler, StockScreener, SnapshotManager, PriceWriteBuffer, MongoLease,
+    ChangeStreamListener,
+]
+DB_ACCESS = re.compile(r"\.objects\b|_get_collection\(|get_db\(\)|\.save\(|\.delete\(|\.reload\(|\.bulk_write\(")
+SELF_CALL = re.compile(r"self\.(\w+)")
+# Methods that only read collection metadata or open change streams, not documents
+NO_QUERY = {'SnapshotManager.restore_sync', 'ChangeStreamListener._watch'}
+
+
+def _methods(cls):
+    return {
+        name: member
+        for name, member in vars(cls).items()
+        if inspect.isfunction(member) or isinstance(member, staticmethod)
+    }
+
+
+def _source(member) -> str:
+    return inspect.getsource(getattr(member, '__func__', member))
+
+
+def _reachable(methods: dict, name: str) -> set:
+    """Methods of the same class reached from `name` through self.<method> references"""
+    seen, stack = set(), [name]
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        stack.extend(call for call in SELF_CALL.findall(_source(methods[current])) if call in methods)
+    return seen
+
+
+def test_every_database_method_has_a_query_shape():
+    listed = {shape.method for shape in canonical_queries()}
+    missing = []
+    for cls in SERVICES:
+        methods = _methods(cls)
+        covered = set()
+        for name in methods:
+            if f"{cls.__name__}.{name}" in listed:
+                covered |= _reachable(methods, name)
+        for name, member in methods.items():
+            qualified = f"{cls.__name__}.{name}"
+            if qualified in NO_QUERY or name in covered:
+                continue
+            if DB_ACCESS.search(_source(member)):
+                missing.append(qualified)
+    assert not missing, f"Add query shapes to canonical_queries() for: {', '.join(sorted(missing))}"
+
+
+def test_listed_methods_exist():
+    classes = {cls.__name__: cls for cls in SERVICES}
+    for shape in canonical_queries():
+        class_name, method = shape.method.split('.')
+        assert hasattr(classes[class_name], method), shape.method
+
+
+def test_recommend_index_orders_equality_sort_range():
+    shape = next(shape for shape in canonical_queries() if shape.method == 'StockService.get_price_bar_columns')
+    assert recommend_index(shape) == [('symbol', 1), ('interval', 1), ('ts', -1)]
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.write_buffer import PriceWriteBuffer
+
+
+class FakeWrite:
+    """Stand-in for PriceWriteBuffer.write that records batches and can hold them"""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, pending):
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.batches.append({symbol: dict(fields) for symbol, (fields, _) in pending.items()})
+        return len(pending)
+
+
+async def _until(event: threading.Event):
+    while not event.is_set():
+        await asyncio.sleep(0.001)
+
+
+def _buffer(write: FakeWrite) -> PriceWriteBuffer:
+    buffer = PriceWriteBuffer(flush_interval=60, max_pending=1000)
+    buffer.write = write
+    return buffer
+
+
+def test_put_coalesces_to_latest_fields():
+    write = FakeWrite()
+    buffer = _buffer(write)
+    buffer.put('AAPL', {'price': 1.0, 'volume': 10})
+    buffer.put('AAPL', {'price': 2.0})
+
+    assert asyncio.run(buffer.flush_async()) == 1
+    assert write.batches == [{'AAPL': {'price': 2.0, 'volume': 10}}]
+    assert len(buffer) == 0
+
+
+def test_put_during_flush_is_overlaid_and_kept_for_next_flush():
+    async def scenario():
+        write = FakeWrite()
+        write.release.clear()
+        buffer = _buffer(write)
+        buffer.put('AAPL', {'price': 1.0, 'volume': 10})
+        flush = asyncio.ensure_future(buffer.flush_async())
+        await _until(write.started)
+
+        buffer.put('AAPL', {'price': 2.0})
+        assert buffer.pending_fields('AAPL') == {'price': 2.0, 'volume': 10}
+        write.release.set()
+        await flush
+
+        assert buffer.pending_fields('AAPL') == {'price': 2.0}
+        await buffer.flush_async()
+        return write.batches
+
+    assert asyncio.run(scenario()) == [{'AAPL': {'price': 1.0, 'volume': 10}}, {'AAPL': {'price': 2.0}}]
+
+
+def test_pop_waits_for_inflight_write_and_returns_its_fields():
+    async def scenario():
+        write = FakeWrite()
+        write.release.clear()
+        buffer = _buffer(write)
+        buffer.put('AAPL', {'price': 1.0, 'volume': 10})
+        flush = asyncio.ensure_future(buffer.flush_async())
+        await _until(write.started)
+        buffer.put('AAPL', {'price': 2.0})
+
+        pop = asyncio.ensure_future(buffer.pop('AAPL'))
+        await asyncio.sleep(0.01)
+        assert not pop.done()
+        write.release.set()
+        fields = await pop
+
+        # The in-flight write has landed before pop returns
+        assert flush.done() and write.batches
+        return fields, len(buffer)
+
+    fields, remaining = asyncio.run(scenario())
+    assert fields == {'price': 2.0, 'volume': 10}
+    assert remaining == 0
+
+
+def test_pop_other_symbol_does_not_wait():
+    async def scenario():
+        write = FakeWrite()
+        write.release.clear()
+        buffer = _buffer(write)
+        buffer.put('AAPL', {'price': 1.0})
+        buffer.put('MSFT', {'price': 3.0})
+        flush = asyncio.ensure_future(buffer.flush_async())
+        await _until(write.started)
+        buffer.put('GOOG', {'price': 4.0})
+
+        fields = await asyncio.wait_for(buffer.pop('GOOG'), 1)
+        write.release.set()
+        await flush
+        return fields, await buffer.pop('TSLA')
+
+    assert asyncio.run(scenario()) == ({'price': 4.0}, None)
+
+
+def test_failed_flush_requeues_with_newer_fields_winning():
+    async def scenario():
+        write = FakeWrite(fail=True)
+        write.release.clear()
+        buffer = _buffer(write)
+        buffer.put('AAPL', {'price': 1.0, 'volume': 10})
+        flush = asyncio.ensure_future(buffer.flush_async())
+        await _until(write.started)
+        buffer.put('AAPL', {'price': 2.0})
+        write.release.set()
+        with pytest.raises(RuntimeError):
+            await flush
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert buffer.failures == 1
+    assert buffer.pending_fields('AAPL') == {'price': 2.0, 'volume': 10}